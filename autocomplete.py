@@ -0,0 +1,94 @@
+# Prefix autocomplete over a fixed list of values (LCI names, ingredient
+# terms), so the app can send a short list of suggestions to the browser
+# instead of the whole catalogue.
+#
+# Every value is indexed under the suffixes starting at each of its words,
+# normalized like the typed prefix (lowercase words joined by single spaces,
+# punctuation dropped): "Chicken, meat, raw" is found by "chi", "chicken meat"
+# and "raw". The keys are kept in one sorted array and a prefix is two
+# bisections.
+import json
+import os
+import re
+
+import numpy as np
+
+from paths import PRODUCT_WEIGHTS_PATH
+
+TOP_K = 20
+
+
+# Lowercase words of a value or a prefix, without the punctuation.
+def normalize_words(text):
+    return re.findall(r'\w+', str(text).lower())
+
+
+class AutocompleteIndex:
+
+    # weights: how often every value is used (higher first), e.g. how many
+    # recipes contain an ingredient. Values without a weight count as 0.
+    def __init__(self, values, weights=None):
+        self.values = np.array(list(dict.fromkeys(values)), dtype=object)
+        weights = weights or {}
+        self.weights = np.array([weights.get(value, 0) for value in self.values], dtype=np.float64)
+
+        keys, value_ids = [], []
+        for value_id, value in enumerate(self.values):
+            words = normalize_words(value)
+            for start in range(len(words)):
+                keys.append(' '.join(words[start:]))
+                value_ids.append(value_id)
+        order = np.argsort(np.array(keys, dtype=str), kind='stable')
+        self.keys = np.array(keys, dtype=str)[order]
+        self.value_ids = np.array(value_ids, dtype=np.int64)[order]
+
+        # Overall ranking (weight desc, then alphabetical), used for the
+        # suggestions of an empty prefix and to order the matches.
+        self.rank = np.empty(len(self.values), dtype=np.int64)
+        self.rank[np.lexsort((self.values.astype(str), -self.weights))] = np.arange(len(self.values))
+
+    def __len__(self):
+        return len(self.values)
+
+    # The k most used values with a word starting with prefix.
+    def complete(self, prefix, k=TOP_K):
+        prefix = ' '.join(normalize_words(prefix))
+        if not prefix:
+            return self.values[np.argsort(self.rank)[:k]].tolist()
+
+        start = np.searchsorted(self.keys, prefix, side='left')
+        end = np.searchsorted(self.keys, prefix + '\U0010ffff', side='left')
+        value_ids = np.unique(self.value_ids[start:end])
+        if len(value_ids) > k:
+            value_ids = value_ids[np.argpartition(self.rank[value_ids], k - 1)[:k]]
+        return self.values[value_ids[np.argsort(self.rank[value_ids])]].tolist()
+
+
+# Saves how many corpus ingredient lines were matched to each product
+# (df_ingredients of build_footprints.py), so the app ranks the products
+# without loading the footprint tables.
+def save_product_weights(df_ingredients, path=PRODUCT_WEIGHTS_PATH):
+    counts = df_ingredients.loc[df_ingredients['lci_name'] != '', 'lci_name'].value_counts()
+    with open(path, 'w') as file:
+        json.dump({name: int(count) for name, count in counts.items()}, file)
+
+
+# Weights saved by save_product_weights, None if not saved yet.
+def load_product_weights(path=PRODUCT_WEIGHTS_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+# Autocomplete over the LCI names, ranked by how many corpus ingredient
+# lines were matched to each product (alphabetical without the weights).
+def product_autocomplete(lci_names, weights_path=PRODUCT_WEIGHTS_PATH):
+    return AutocompleteIndex(lci_names, load_product_weights(weights_path))
+
+
+# Autocomplete over the ingredient terms of the corpus, ranked by the number
+# of recipes using them (see ingredient_index.py).
+def ingredient_autocomplete(ingredient_index):
+    weights = dict(zip(ingredient_index.terms.tolist(), np.diff(ingredient_index.offsets).tolist()))
+    return AutocompleteIndex(ingredient_index.terms.tolist(), weights)
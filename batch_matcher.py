@@ -0,0 +1,128 @@
+import re
+
+import numpy as np
+import scipy.sparse as sp
+
+# Length of the character n-grams used to compare ingredients and LCI names.
+NGRAM_SIZE = 3
+
+# Index returned for an ingredient sharing no n-gram with any LCI name (its
+# name in match tuples is '').
+NO_MATCH = -1
+
+# Number of ingredients scored per sparse matrix product. Bounds the size of
+# the dense (chunk x catalogue) score block.
+CHUNK_SIZE = 1024
+
+# Words of an ingredient line that say nothing about the product itself.
+STOP_WORDS = {
+    'a', 'about', 'and', 'or', 'of', 'to', 'for', 'into', 'in', 'with', 'plus', 'more', 'taste', 'divided',
+    'cup', 'cups', 'tablespoon', 'tablespoons', 'tbsp', 'teaspoon', 'teaspoons', 'tsp', 'ounce', 'ounces', 'oz',
+    'pound', 'pounds', 'lb', 'lbs', 'gram', 'grams', 'g', 'kilogram', 'kg', 'ml', 'liter', 'quart', 'pint',
+    'can', 'cans', 'jar', 'bottle', 'package', 'packages', 'pinch', 'piece', 'pieces', 'slice', 'slices',
+    'clove', 'cloves', 'bunch', 'bunches', 'small', 'medium', 'large', 'whole',
+    'chopped', 'minced', 'sliced', 'diced', 'grated', 'shredded', 'crushed', 'peeled', 'finely', 'coarsely',
+    'thinly', 'freshly', 'cut', 'softened', 'melted', 'beaten', 'optional',
+}
+
+
+# Lower-cases the text and keeps only the words that describe the product.
+def clean_text(text):
+    words = re.findall(r'[a-z]+', str(text).lower())
+    return ' '.join(word for word in words if word not in STOP_WORDS)
+
+
+def char_ngrams(text, n=NGRAM_SIZE):
+    padded = f' {text} '
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class BatchMatcher:
+    # TF-IDF weighted character n-gram matcher. The LCI catalogue is vectorized
+    # once; a batch of ingredients is then scored against every LCI name with
+    # a single sparse matrix product (cosine similarity, scaled to 0-100).
+
+    def __init__(self, lci_names):
+        self.lci_names = [str(name) for name in lci_names]
+
+        vocabulary = {}
+        rows, cols = [], []
+        for row, name in enumerate(self.lci_names):
+            for ngram in char_ngrams(clean_text(name)):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(ngram, len(vocabulary)))
+        self.vocabulary = vocabulary
+
+        counts = sp.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                               shape=(len(self.lci_names), len(vocabulary)))
+        document_frequency = np.bincount(counts.indices, minlength=len(vocabulary))
+        self.idf = np.log((1 + len(self.lci_names)) / (1 + document_frequency)) + 1
+
+        # Transposed so that queries @ catalogue gives a (queries x names) score matrix.
+        self._catalogue = self._weight(counts).T.tocsr()
+
+    def __len__(self):
+        return len(self.lci_names)
+
+    def vectorize(self, texts):
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for ngram in char_ngrams(clean_text(text)):
+                col = self.vocabulary.get(ngram)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        counts = sp.csr_matrix((np.ones(len(rows)), (rows, cols)),
+                               shape=(len(texts), len(self.vocabulary)))
+        return self._weight(counts)
+
+    # Returns the best LCI row index and its score for every ingredient.
+    def match(self, ingredients, chunk_size=CHUNK_SIZE):
+        ingredients = [clean_text(ingredient) for ingredient in ingredients]
+        # Corpus ingredient lines repeat a lot, so only distinct ones are scored.
+        unique, inverse = np.unique(np.array(ingredients, dtype=object), return_inverse=True)
+
+        best_index = np.zeros(len(unique), dtype=np.int64)
+        best_score = np.zeros(len(unique))
+        for start in range(0, len(unique), chunk_size):
+            scores = (self.vectorize(unique[start:start + chunk_size]) @ self._catalogue).toarray()
+            best = scores.argmax(axis=1)
+            best_index[start:start + chunk_size] = best
+            best_score[start:start + chunk_size] = scores[np.arange(len(best)), best]
+
+        # An all-zero score row is no match, not a match to the first name.
+        best_index[best_score == 0] = NO_MATCH
+        inverse = inverse.reshape(-1)
+        return best_index[inverse], np.round(best_score[inverse] * 100, 1)
+
+    # Same output as match_cache.MatchCache stores: (LCI Name, score, index).
+    def match_one(self, ingredient):
+        return self.match_tuples([ingredient])[0]
+
+    # (LCI Name, score, index) of every ingredient; ('', 0.0, NO_MATCH) when
+    # nothing matches.
+    def match_tuples(self, ingredients):
+        index, score = self.match(ingredients)
+        return [(self.lci_names[i] if i != NO_MATCH else '', float(s), int(i)) for i, s in zip(index, score)]
+
+    def _weight(self, counts):
+        weighted = sp.csr_matrix(counts.multiply(self.idf))
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1))).ravel()
+        norms[norms == 0] = 1
+        return sp.csr_matrix(sp.diags(1 / norms) @ weighted)
+
+
+# Matches a list of ingredient lines, answering repeated lines from the match
+# cache and scoring all the misses in one batch.
+def match_ingredients(ingredients, matcher, cache=None):
+    if cache is None:
+        return matcher.match_tuples(ingredients)
+
+    matches = cache.get_many(ingredients)
+    missing = [ingredient for ingredient, match in zip(ingredients, matches) if match is None]
+    if missing:
+        new_matches = matcher.match_tuples(missing)
+        cache.put_many(missing, new_matches)
+        new_matches = iter(new_matches)
+        matches = [match if match is not None else next(new_matches) for match in matches]
+    return matches
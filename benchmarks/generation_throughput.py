@@ -0,0 +1,50 @@
+# Characters per second of the recipe generation (recipe_generator.py) for
+# a few batch sizes. The stop sign is ignored so every run generates exactly
+# num_generate characters per row.
+#
+# Usage: python benchmarks/generation_throughput.py [num_generate] [batch sizes...]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from recipe_generator import MODEL_PATH, iter_generate_batch, load_model  # noqa: E402
+
+NUM_GENERATE = 300
+BATCH_SIZES = [1, 14]
+
+
+def generation_throughput(model, batch_size, num_generate=NUM_GENERATE):
+    start_strings = ['A'] * batch_size
+    temperatures = [1.0] * batch_size
+
+    start = time.perf_counter()
+    first_chunk = None
+    n_chars = 0
+    for step, (chunks, _) in enumerate(iter_generate_batch(model, start_strings, temperatures, num_generate,
+                                                           stop_at_stop_sign=False)):
+        if step == 0:
+            continue
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        n_chars += sum(map(len, chunks))
+    seconds = time.perf_counter() - start
+    return {'batch_size': batch_size, 'characters': n_chars, 'seconds': seconds,
+            'chars_per_second': n_chars / seconds, 'first_chunk_seconds': first_chunk}
+
+
+def main(num_generate=NUM_GENERATE, batch_sizes=BATCH_SIZES):
+    for batch_size in batch_sizes:
+        model = load_model(MODEL_PATH, batch_size)
+        # The first run traces the compiled step
+        generation_throughput(model, batch_size, num_generate=2)
+        result = generation_throughput(model, batch_size, num_generate)
+        print(f"batch {result['batch_size']:>3}: {result['chars_per_second']:>8.0f} chars/s "
+              f"({result['characters']} chars in {result['seconds']:.2f} s, "
+              f"first chunk after {result['first_chunk_seconds'] * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else NUM_GENERATE,
+         [int(arg) for arg in sys.argv[2:]] or BATCH_SIZES)
@@ -0,0 +1,175 @@
+# Comparison of the variants of the recipe generation model for CPU hosts:
+# the Keras float32 model, the NumPy engine (numpy_lstm.py) and the float32
+# and dynamic-range quantized TFLite conversions (quantize_model.py).
+#
+# Every variant is measured in a fresh interpreter, so the peak RSS is the one
+# of a process serving only that variant (runtime included). The loss is the
+# mean next-character cross-entropy (nats) over an evenly spread sample of
+# the recipe store, each recipe followed by the stop sign. The training
+# notebook did not keep a held-out split: for a true held-out loss, pass
+# recipes left out of training with --texts (a JSON list of recipe strings,
+# see recipes.recipe_to_string).
+#
+# Usage: python benchmarks/model_variants.py [--texts recipes.json] [--output results.json]
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from generation import STOP_SIGN  # noqa: E402
+
+VARIANTS = {
+    'keras float32': 'recipe_generation_rnn.h5',
+    'numpy float32': 'recipe_generation_rnn.npz',
+    'tflite float32': 'recipe_generation_rnn_float32.tflite',
+    'tflite int8 (dynamic range)': 'recipe_generation_rnn_int8.tflite',
+}
+
+NUM_GENERATE = 300
+BATCH_SIZE = 14
+EVAL_RECIPES = 16
+# Recipes longer than this were left out of training (see recipes_generator.ipynb).
+MAX_RECIPE_LENGTH = 2000
+
+
+# Recipe strings spread evenly over the recipe store, at most max_length long
+# once the stop sign is added.
+def evaluation_texts(n=EVAL_RECIPES, max_length=MAX_RECIPE_LENGTH):
+    from recipe_store import open_recipe_store
+    from recipes import join_recipe
+
+    store = open_recipe_store()
+    texts = []
+    for recipe_id in np.linspace(0, len(store) - 1, n * 4).astype(int):
+        text = join_recipe(store.title(recipe_id), store.ingredients(recipe_id), store.procedure(recipe_id))
+        if len(text) < max_length:
+            texts.append(text + STOP_SIGN)
+        if len(texts) == n:
+            break
+    return texts
+
+
+# Mean next-character cross-entropy of (batch, length, vocab) logits; the
+# positions past the end of every sequence are left out.
+def mean_loss(logits, sequences, lengths):
+    from scipy.special import log_softmax
+
+    log_probs = log_softmax(logits[:, :-1].astype(np.float64), axis=-1)
+    targets = sequences[:, 1:]
+    picked = np.take_along_axis(log_probs, targets[..., None], axis=-1)[..., 0]
+    mask = np.arange(targets.shape[1]) < (lengths - 1)[:, None]
+    return float(-(picked * mask).sum() / mask.sum())
+
+
+def _padded(sequences):
+    lengths = np.array([len(sequence) for sequence in sequences])
+    padded = np.zeros((len(sequences), lengths.max()), dtype=np.int64)
+    for row, sequence in enumerate(sequences):
+        padded[row, :len(sequence)] = sequence
+    return padded, lengths
+
+
+def _chars_per_second(iter_generate_batch, model, batch_size, num_generate):
+    start_strings, temperatures = ['A'] * batch_size, [1.0] * batch_size
+    # Warm-up (traces the Keras step)
+    for _ in iter_generate_batch(model, start_strings, temperatures, 2, stop_at_stop_sign=False):
+        pass
+    start = time.perf_counter()
+    n_chars = 0
+    for step, (chunks, _) in enumerate(iter_generate_batch(model, start_strings, temperatures, num_generate,
+                                                           stop_at_stop_sign=False)):
+        if step:
+            n_chars += sum(map(len, chunks))
+    return n_chars / (time.perf_counter() - start)
+
+
+# Measures one variant in the current process.
+def measure(variant, path, texts, batch_size=BATCH_SIZE, num_generate=NUM_GENERATE):
+    start = time.perf_counter()
+    if path.endswith('.h5'):
+        from recipe_generator import iter_generate_batch, load_model, tokenizer
+        model = load_model(path, batch_size)
+        load_seconds = time.perf_counter() - start
+        chars_per_second = _chars_per_second(iter_generate_batch, model, batch_size, num_generate)
+        sequences, lengths = _padded(tokenizer.texts_to_sequences(texts))
+        eval_model = load_model(path, len(texts))
+        eval_model.reset_states()
+        logits = eval_model(sequences).numpy()
+    else:
+        from numpy_lstm import NumpyLSTM, iter_generate_batch
+        if path.endswith('.tflite'):
+            from quantize_model import TFLiteLSTM
+            model = TFLiteLSTM(path)
+        else:
+            model = NumpyLSTM(path)
+        load_seconds = time.perf_counter() - start
+        chars_per_second = _chars_per_second(iter_generate_batch, model, batch_size, num_generate)
+        sequences, lengths = _padded(model.texts_to_sequences(texts))
+        logits = model.predict(sequences)
+
+    return {
+        'variant': variant,
+        'path': path,
+        'size_mb': os.path.getsize(path) / 2**20,
+        'load_seconds': load_seconds,
+        'chars_per_second': chars_per_second,
+        'batch_size': batch_size,
+        # ru_maxrss is in kB on Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'loss': mean_loss(logits, sequences, lengths),
+    }
+
+
+def print_report(results):
+    print(f"{'variant':<30}{'size MB':>9}{'chars/s':>10}{'peak RSS MB':>13}{'loss':>8}{'load s':>8}")
+    for result in results:
+        print(f"{result['variant']:<30}{result['size_mb']:>9.1f}{result['chars_per_second']:>10.0f}"
+              f"{result['peak_rss_mb']:>13.0f}{result['loss']:>8.4f}{result['load_seconds']:>8.2f}")
+
+
+def main(texts_path=None, output_path=None):
+    results = []
+    for variant, path in VARIANTS.items():
+        if not os.path.exists(os.path.join(ROOT, path)):
+            print(f'{variant}: {path} not found, skipped')
+            continue
+        command = [sys.executable, os.path.abspath(__file__), '--measure', variant, path]
+        if texts_path:
+            command += ['--texts', os.path.abspath(texts_path)]
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f'{variant}: failed\n{result.stderr.strip()}')
+            continue
+        results.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    print_report(results)
+    if output_path:
+        with open(output_path, 'w') as file:
+            json.dump(results, file, indent=2)
+    return results
+
+
+def _option(args, name):
+    return args[args.index(name) + 1] if name in args else None
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    texts_path = _option(args, '--texts')
+    if '--measure' in args:
+        variant, path = args[args.index('--measure') + 1:args.index('--measure') + 3]
+        if texts_path:
+            with open(texts_path, encoding='utf-8') as file:
+                texts = [text + STOP_SIGN for text in json.load(file)]
+        else:
+            texts = evaluation_texts()
+        print(json.dumps(measure(variant, path, texts)))
+    else:
+        main(texts_path, _option(args, '--output'))
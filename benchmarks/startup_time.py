@@ -0,0 +1,95 @@
+# Import-time profile of the Streamlit app and cold start budget check.
+#
+# The imports are read from app.py itself: the top-level ones are paid by
+# every run, the ones inside an `if selected2 == '<page>':` block (at any
+# depth, e.g. in the try of the instrumented run) only when that page is
+# opened. Each set is imported in a fresh interpreter with
+# `python -X importtime`, and the most expensive top-level modules are
+# listed. Cold start is the shell plus the default page (Home); the script
+# exits with status 1 when it goes over the budget.
+#
+# Usage: python benchmarks/startup_time.py [budget_seconds]
+import ast
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+APP_PATH = os.path.join(ROOT, 'app.py')
+
+# Seconds allowed for the imports of a cold start (shell + default page).
+COLD_START_BUDGET = 3.0
+DEFAULT_PAGE = 'Home'
+TOP_MODULES = 10
+
+
+def _import_statements(nodes):
+    return [ast.unparse(node) for node in nodes if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+# (shell imports, {page: imports}) of app.py
+def app_imports(path=APP_PATH):
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    shell = _import_statements(tree.body)
+    pages = {}
+    for node in ast.walk(tree):
+        if (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+                and isinstance(node.test.left, ast.Name) and node.test.left.id == 'selected2'
+                and isinstance(node.test.comparators[0], ast.Constant)):
+            pages[node.test.comparators[0].value] = _import_statements(node.body)
+    return shell, pages
+
+
+# Wall time of the statements in a fresh interpreter and the cumulative
+# import time (seconds) of every top-level module, most expensive first.
+def profile_imports(statements):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', '\n'.join(statements) or 'pass'],
+                            cwd=ROOT, capture_output=True, text=True)
+    seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them.
+        if not name[1:].startswith(' '):
+            modules[name.strip()] = int(cumulative) / 1e6
+    return seconds, sorted(modules.items(), key=lambda item: item[1], reverse=True)
+
+
+def print_profile(name, seconds, modules, top=TOP_MODULES):
+    print(f'{name}: {seconds:.2f} s')
+    for module, module_seconds in modules[:top]:
+        print(f'    {module_seconds * 1000:>8.0f} ms  {module}')
+
+
+def main(budget=COLD_START_BUDGET):
+    shell, pages = app_imports()
+    if DEFAULT_PAGE not in pages:
+        raise RuntimeError(f'No `if selected2 == {DEFAULT_PAGE!r}:` page found in {APP_PATH}')
+    baseline, _ = profile_imports([])
+    print(f'Interpreter startup: {baseline:.2f} s\n')
+
+    cold_start = None
+    for page, statements in [(None, [])] + list(pages.items()):
+        seconds, modules = profile_imports(shell + statements)
+        print_profile(page or 'Shell (every page)', seconds, modules)
+        if page == DEFAULT_PAGE:
+            cold_start = seconds
+        print()
+
+    print(f'Cold start ({DEFAULT_PAGE}): {cold_start:.2f} s, budget {budget:.2f} s')
+    if cold_start > budget:
+        print('Cold start is over budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else COLD_START_BUDGET))
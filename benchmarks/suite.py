@@ -0,0 +1,341 @@
+# Benchmark suite of the hot paths, run on a synthetic corpus
+# (synthetic_corpus.py) so it works offline and at any scale:
+#   matching    BatchMatcher on the corpus lines, fuzzywuzzy extractOne (the
+#               original path, when fuzzywuzzy is installed) on a few
+#   parsing     parse_ingredients, convert_quantity
+#   footprint   one recipe: parse, match and sum its impacts
+#   search      the cookbook search: pandas str.contains (original), the
+#               recipe store regex and the ingredient index
+#   generation  one step and one full recipe (needs the exported NumPy
+#               weights, or TensorFlow and the Keras model)
+#
+# Every benchmark has a setup (not timed) and a timed function; the timed
+# function is called until it ran for at least MIN_SECONDS, REPEAT times (fewer
+# past MAX_SECONDS), and the per-call minimum and median are kept. Results are saved under
+# benchmarks/results/ with the git commit, and compared with the last saved
+# results: ratios over REGRESSION_RATIO are flagged.
+#
+# Usage: python benchmarks/suite.py [--recipes N] [--seed N] [--filter substring] [--no-save] [--compare results.json]
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(BENCHMARKS_DIR, '..')
+sys.path.insert(0, ROOT)
+
+from paths import MODEL_PATH, NUMPY_MODEL_PATH  # noqa: E402
+from synthetic_corpus import SEED, write_raw_dataset  # noqa: E402
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+N_RECIPES = 10_000
+REPEAT = 5
+MIN_SECONDS = 0.2
+# Slow benchmarks get fewer repeats, so none takes much longer than this.
+MAX_SECONDS = 10.0
+REGRESSION_RATIO = 1.2
+
+# Registered benchmarks: name -> (setup(corpus) -> args, timed(*args))
+BENCHMARKS = {}
+
+
+def benchmark(name, setup):
+    def register(function):
+        BENCHMARKS[name] = (setup, function)
+        return function
+    return register
+
+
+class SkipBenchmark(Exception):
+    pass
+
+################################# Corpus
+
+# Everything the benchmarks share, built once from the synthetic raw files.
+class Corpus:
+
+    def __init__(self, n_recipes=N_RECIPES, seed=SEED, work_dir=None):
+        from footprint import PRODUCTS_PATH, extract_products, load_products
+        from recipes import iter_recipes, split_recipe
+
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='benchmarks-')
+        raw_dir = write_raw_dataset(n_recipes, os.path.join(self.work_dir, 'raw'), seed)
+        self.recipe_strings = list(iter_recipes(raw_dir))
+        self.recipes = [split_recipe(recipe_string) for recipe_string in self.recipe_strings]
+        self.ingredient_blocks = [ingredients for _, ingredients, _ in self.recipes]
+        self.lines = [line.replace('• ', '') for block in self.ingredient_blocks for line in block.split('\n')
+                      if line.strip()]
+        self.df_extracted = extract_products(load_products(os.path.join(ROOT, PRODUCTS_PATH)))
+        self._cache = {}
+
+    def cached(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    def matcher(self):
+        from batch_matcher import BatchMatcher
+        return self.cached('matcher', lambda: BatchMatcher(self.df_extracted['LCI Name']))
+
+    def impacts(self):
+        from impact_matrix import ImpactMatrix
+        return self.cached('impacts', lambda: ImpactMatrix(self.df_extracted))
+
+    def recipes_csv(self):
+        def build():
+            from recipes import write_recipes_csv
+            path = os.path.join(self.work_dir, 'recipes.csv')
+            write_recipes_csv(self.recipe_strings, path)
+            return path
+        return self.cached('recipes_csv', build)
+
+    def recipe_model(self):
+        def build():
+            numpy_path = os.path.join(ROOT, NUMPY_MODEL_PATH)
+            if os.path.exists(numpy_path):
+                from numpy_lstm import NumpyLSTM
+                return 'numpy', NumpyLSTM(numpy_path)
+            model_path = os.path.join(ROOT, MODEL_PATH)
+            if not os.path.exists(model_path):
+                raise SkipBenchmark(f'no recipe model ({NUMPY_MODEL_PATH} or {MODEL_PATH})')
+            try:
+                from recipe_generator import load_model
+                return 'keras', load_model(model_path, batch_size=1)
+            except (ImportError, OSError) as error:
+                raise SkipBenchmark(f'no recipe model ({error})')
+        return self.cached('recipe_model', build)
+
+################################# Benchmarks
+
+LINES_PER_BATCH = 1_000
+EXTRACT_ONE_LINES = 5
+SEARCH_TERMS = ['chicken', 'garlic', 'lemon']
+
+
+@benchmark('matching.batch_matcher_1k_lines', lambda corpus: (corpus.matcher(), corpus.lines[:LINES_PER_BATCH]))
+def time_batch_matcher(matcher, lines):
+    matcher.match(lines)
+
+
+def _extract_one_setup(corpus):
+    try:
+        from fuzzywuzzy import process
+    except ImportError:
+        raise SkipBenchmark('fuzzywuzzy is not installed')
+    return process, corpus.df_extracted['LCI Name'].tolist(), corpus.lines[:EXTRACT_ONE_LINES]
+
+
+# The matching the app did before batch_matcher.py, one line at a time.
+@benchmark('matching.extract_one_5_lines', _extract_one_setup)
+def time_extract_one(process, names, lines):
+    for line in lines:
+        process.extractOne(line, names)
+
+
+@benchmark('parsing.parse_ingredients_all_lines', lambda corpus: (corpus.lines,))
+def time_parse_ingredients(lines):
+    from ingredient_parser import parse_ingredients
+    parse_ingredients(lines)
+
+
+def _convert_quantity_setup(corpus):
+    from ingredient_parser import parse_ingredients
+    parsed = parse_ingredients(corpus.lines)
+    return parsed['quantity'], parsed['unit']
+
+
+@benchmark('parsing.convert_quantity_all_lines', _convert_quantity_setup)
+def time_convert_quantity(quantity, unit):
+    from footprint import convert_quantity
+    convert_quantity(quantity, unit)
+
+
+def _recipe_footprint_setup(corpus):
+    lines = [line.replace('• ', '') for line in corpus.ingredient_blocks[0].split('\n') if line.strip()]
+    return corpus.matcher(), corpus.impacts(), lines
+
+
+@benchmark('footprint.one_recipe', _recipe_footprint_setup)
+def time_recipe_footprint(matcher, impacts, lines):
+    from batch_matcher import match_ingredients
+    from footprint import convert_quantity
+    from ingredient_parser import parse_ingredients
+
+    matches = match_ingredients(lines, matcher)
+    parsed = parse_ingredients(lines)
+    kg = convert_quantity(parsed['quantity'], parsed['unit']).to_numpy()
+    impacts.footprint(np.array([match[2] for match in matches]), kg)
+
+
+def _str_contains_setup(corpus):
+    import pandas as pd
+    return pd.read_csv(corpus.recipes_csv()), SEARCH_TERMS
+
+
+@benchmark('search.str_contains', _str_contains_setup)
+def time_str_contains(df, terms):
+    df[df['Ingredients'].str.contains('|'.join(terms))]
+
+
+def _recipe_store_setup(corpus):
+    from recipe_store import open_recipe_store
+    return open_recipe_store(corpus.recipes_csv(), os.path.join(corpus.work_dir, 'store')), SEARCH_TERMS
+
+
+@benchmark('search.recipe_store', _recipe_store_setup)
+def time_recipe_store_search(store, terms):
+    store.search('Ingredients', terms)
+
+
+def _ingredient_index_setup(corpus):
+    from ingredient_index import IngredientIndex
+    return IngredientIndex.build(corpus.ingredient_blocks), SEARCH_TERMS
+
+
+@benchmark('search.ingredient_index', _ingredient_index_setup)
+def time_ingredient_index_search(index, terms):
+    index.search(terms, mode='any')
+
+
+def _generation_step_setup(corpus):
+    kind, model = corpus.recipe_model()
+    if kind == 'numpy':
+        return kind, model, model.initial_state(1)
+    from recipe_generator import generation_step
+    import tensorflow as tf
+    return kind, generation_step(model), tf.constant([[1.0]])
+
+
+@benchmark('generation.one_step', _generation_step_setup)
+def time_generation_step(kind, model, state):
+    if kind == 'numpy':
+        model.step(np.array([1]), state)
+    else:
+        import tensorflow as tf
+        model(tf.constant([[1]], dtype=tf.int64), state)
+
+
+@benchmark('generation.one_recipe', lambda corpus: corpus.recipe_model())
+def time_generate_recipe(kind, model):
+    if kind == 'numpy':
+        from numpy_lstm import generate_batch
+        generate_batch(model, [''], [1.0], stop_at_stop_sign=False, seed=0)
+    else:
+        from recipe_generator import generate_text
+        generate_text(model, '')
+
+################################# Running
+
+# Seconds per call of function(*args): minimum and median over repeat runs.
+def measure(function, args, repeat=REPEAT, min_seconds=MIN_SECONDS, max_seconds=MAX_SECONDS):
+    number, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function(*args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            break
+        number = max(number * 2, int(number * min_seconds / max(elapsed, 1e-9)))
+    timings = [elapsed / number]
+    repeat = max(1, min(repeat, int(max_seconds / elapsed)))
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function(*args)
+        timings.append((time.perf_counter() - start) / number)
+    return {'min': min(timings), 'median': float(np.median(timings)), 'repeat': repeat, 'calls': number * repeat}
+
+
+def run(n_recipes=N_RECIPES, seed=SEED, name_filter=''):
+    corpus = Corpus(n_recipes, seed)
+    results = {}
+    for name, (setup, function) in BENCHMARKS.items():
+        if name_filter not in name:
+            continue
+        try:
+            args = setup(corpus)
+        except SkipBenchmark as reason:
+            print(f'{name:<40} skipped: {reason}')
+            continue
+        results[name] = measure(function, args)
+        print(f"{name:<40} {results[name]['min'] * 1000:>10.3f} ms")
+    return {
+        'commit': _git_commit(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor(), 'cpus': os.cpu_count()},
+        'corpus': {'recipes': n_recipes, 'seed': seed, 'filtered': len(corpus.recipe_strings),
+                   'lines': len(corpus.lines)},
+        'results': results,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def save(report, results_dir=RESULTS_DIR):
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, f"{report['date'].replace(':', '')}_{report['commit']}.json")
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+    return path
+
+
+# Last saved results with the same corpus size and seed, or None.
+def latest_results(report, results_dir=RESULTS_DIR):
+    for path in sorted(glob.glob(os.path.join(results_dir, '*.json')), reverse=True):
+        with open(path) as file:
+            previous = json.load(file)
+        if previous['corpus']['recipes'] == report['corpus']['recipes'] and \
+                previous['corpus']['seed'] == report['corpus']['seed']:
+            return previous
+    return None
+
+
+# Prints the ratio of every minimum to the previous one; returns the names
+# of the benchmarks slower by more than regression_ratio.
+def compare(report, previous, regression_ratio=REGRESSION_RATIO):
+    print(f"\nCompared with {previous['commit']} ({previous['date']}):")
+    regressions = []
+    for name, result in report['results'].items():
+        if name not in previous['results']:
+            continue
+        ratio = result['min'] / previous['results'][name]['min']
+        flag = ''
+        if ratio > regression_ratio:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:<40} {ratio:>7.2f}x{flag}')
+    return regressions
+
+
+def _option(args, name, default):
+    return type(default)(args[args.index(name) + 1]) if name in args else default
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    report = run(_option(args, '--recipes', N_RECIPES), _option(args, '--seed', SEED), _option(args, '--filter', ''))
+    compare_path = _option(args, '--compare', '')
+    if compare_path:
+        with open(compare_path) as file:
+            previous = json.load(file)
+    else:
+        previous = latest_results(report)
+    regressions = compare(report, previous) if previous else []
+    if '--no-save' not in args:
+        print(f'\nSaved to {save(report)}')
+    sys.exit(1 if regressions else 0)
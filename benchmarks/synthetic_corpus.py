@@ -0,0 +1,134 @@
+# Seeded synthetic recipe corpus in the raw JSON schema of recipes.py
+# ({"<id>": {"title", "ingredients": [...], "instructions"}, ...} split over
+# the DATASET_FILE_NAMES), so the pipelines can be measured offline at any
+# scale (1k to 1M recipes) without the real dataset.
+#
+# The same seed and size always give the same files. A small share of the
+# recipes is invalid (a required field empty) or longer than
+# MAX_RECIPE_LENGTH, and some lines carry the ADVERTISEMENT noise, so every
+# stage of recipes.iter_recipes has work to do.
+#
+# Usage: python benchmarks/synthetic_corpus.py <n_recipes> [output_dir] [seed]
+import json
+import os
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from recipes import DATASET_FILE_NAMES  # noqa: E402
+
+SEED = 0
+OUTPUT_DIR = 'data/synthetic_raw'
+
+# Share of the recipes with an empty required field.
+INVALID_SHARE = 0.02
+# Share of the recipes with many more steps (most of them end up over MAX_RECIPE_LENGTH).
+LONG_SHARE = 0.15
+NOISE_SHARE = 0.03
+
+PRODUCTS = [
+    'onion', 'garlic', 'tomatoes', 'carrots', 'potatoes', 'butter', 'olive oil', 'vegetable oil', 'eggs', 'milk',
+    'heavy cream', 'sour cream', 'all-purpose flour', 'sugar', 'brown sugar', 'honey', 'salt', 'black pepper',
+    'paprika', 'cumin', 'cinnamon', 'vanilla extract', 'baking powder', 'baking soda', 'chicken breasts',
+    'ground beef', 'pork chops', 'bacon', 'salmon fillets', 'shrimp', 'tofu', 'chickpeas', 'black beans',
+    'lentils', 'rice', 'spaghetti', 'parmesan cheese', 'cheddar cheese', 'mozzarella', 'lemon juice', 'lime',
+    'apples', 'strawberries', 'blueberries', 'bananas', 'mushrooms', 'spinach', 'broccoli', 'zucchini',
+    'bell pepper', 'celery', 'parsley', 'basil', 'thyme', 'ginger', 'soy sauce', 'chicken broth', 'walnuts',
+    'almonds', 'chocolate chips', 'cocoa powder', 'oats', 'yogurt', 'mayonnaise', 'mustard', 'vinegar',
+]
+PREPARATIONS = ['', '', '', 'chopped', 'finely chopped', 'minced', 'sliced', 'diced', 'grated', 'melted',
+                'softened', 'divided', 'to taste', 'peeled and cubed']
+QUANTITIES = ['1', '2', '3', '4', '6', '8', '1/2', '1/4', '3/4', '1 1/2', '2 1/2', '1/3', '½', '1½', '2-3',
+              '1 to 2', '100', '250', '500', '1.5']
+UNITS = ['', '', 'cup', 'cups', 'tablespoon', 'tablespoons', 'tbsp', 'teaspoon', 'teaspoons', 'tsp', 'ounces',
+         'oz', 'pound', 'lb', 'g', 'grams', 'kg', 'ml', 'liter', 'can', 'cloves', 'pinch', 'slices', 'package',
+         '(8 ounce) package', '(15 ounce) can']
+ADJECTIVES = ['Easy', 'Classic', 'Spicy', 'Creamy', 'Quick', "Grandma's", 'Roasted', 'Grilled', 'Vegan',
+              'Crispy', 'Healthy', 'Lemon', 'Garlic', 'Honey', 'Smoky', 'Summer', 'Holiday']
+DISHES = ['Soup', 'Salad', 'Stew', 'Cake', 'Pie', 'Casserole', 'Pasta', 'Curry', 'Tacos', 'Bread', 'Muffins',
+          'Stir-Fry', 'Risotto', 'Chili', 'Cookies', 'Skillet', 'Bowl', 'Sandwich', 'Tart', 'Pancakes']
+STEPS = [
+    'Preheat the oven to {temperature} degrees F.',
+    'In a large bowl, mix the {a} and the {b}.',
+    'Heat the {a} in a skillet over medium heat.',
+    'Add the {a} and cook for {minutes} minutes, stirring often.',
+    'Stir in the {a} and {b}; season with salt and pepper.',
+    'Bring to a boil, then reduce heat and simmer for {minutes} minutes.',
+    'Pour into the prepared pan and bake for {minutes} minutes.',
+    'Whisk the {a} with the {b} until smooth.',
+    'Let cool for {minutes} minutes before serving.',
+    'Garnish with {a} and serve warm.',
+]
+
+
+def _ingredient(rng, noise):
+    parts = [rng.choice(QUANTITIES), rng.choice(UNITS), rng.choice(PRODUCTS)]
+    line = ' '.join(part for part in parts if part)
+    preparation = rng.choice(PREPARATIONS)
+    if preparation:
+        line += f', {preparation}'
+    if noise and rng.random() < 0.3:
+        line += 'ADVERTISEMENT'
+    return line
+
+
+def _instructions(rng, products, n_steps, noise):
+    steps = []
+    for _ in range(n_steps):
+        a, b = rng.sample(products, 2)
+        steps.append(rng.choice(STEPS).format(a=a, b=b, minutes=rng.randint(2, 59),
+                                              temperature=rng.choice([325, 350, 375, 400, 425])))
+        if noise and rng.random() < 0.2:
+            steps.append('ADVERTISEMENT')
+    return '\n'.join(steps)
+
+
+# One raw recipe (dict of the raw schema); rng is a random.Random.
+def synthetic_recipe(rng):
+    noise = rng.random() < NOISE_SHARE
+    n_ingredients = rng.randint(3, 15)
+    n_steps = rng.randint(2, 8) if rng.random() > LONG_SHARE else rng.randint(15, 50)
+    ingredients = [_ingredient(rng, noise) for _ in range(n_ingredients)]
+    recipe = {
+        'title': f'{rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS).title()} {rng.choice(DISHES)}',
+        'ingredients': ingredients,
+        'instructions': _instructions(rng, PRODUCTS, n_steps, noise),
+    }
+    if rng.random() < INVALID_SHARE:
+        recipe[rng.choice(['title', 'ingredients', 'instructions'])] = [] if rng.random() < 0.5 else ''
+    return recipe
+
+
+def synthetic_recipes(n_recipes, seed=SEED):
+    # random.Random rather than NumPy: much cheaper for one draw at a time
+    rng = random.Random(seed)
+    for _ in range(n_recipes):
+        yield synthetic_recipe(rng)
+
+
+# Writes the corpus as the raw files, the recipes spread evenly over them.
+# The files are written one recipe at a time, so 1M recipes fit in memory.
+def write_raw_dataset(n_recipes, output_dir=OUTPUT_DIR, seed=SEED, file_names=DATASET_FILE_NAMES):
+    os.makedirs(output_dir, exist_ok=True)
+    recipes = synthetic_recipes(n_recipes, seed)
+    bounds = np.linspace(0, n_recipes, len(file_names) + 1).astype(int)
+    for file_name, start, end in zip(file_names, bounds[:-1], bounds[1:]):
+        with open(os.path.join(output_dir, file_name), 'w', encoding='utf-8') as file:
+            file.write('{')
+            for recipe_id in range(start, end):
+                if recipe_id > start:
+                    file.write(',')
+                file.write(f'"synthetic{recipe_id}":{json.dumps(next(recipes))}')
+            file.write('}')
+    return output_dir
+
+
+if __name__ == '__main__':
+    n_recipes = int(sys.argv[1])
+    output_dir = sys.argv[2] if len(sys.argv) > 2 else OUTPUT_DIR
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else SEED
+    write_raw_dataset(n_recipes, output_dir, seed)
+    print(f'{n_recipes} synthetic recipes written to {output_dir}')
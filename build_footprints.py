@@ -0,0 +1,61 @@
+# Offline build stage: computes the environmental footprint of every recipe
+# in data/recipes_full.csv and writes it as two parquet tables, one row per
+# ingredient line and one row per recipe. The app loads them once, so the
+# footprint of a recipe is a keyed lookup instead of a live matching run.
+# The recipes x products quantity matrix (recipe_matrix.py) and a snapshot
+# of the products used (for incremental_update.py) are saved too.
+#
+# Usage: python build_footprints.py [recipes.csv] [products.csv]
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from autocomplete import save_product_weights
+from batch_matcher import BatchMatcher, match_ingredients
+from footprint import (FOOTPRINTS_DIR, INGREDIENT_FOOTPRINTS_PATH, PRODUCTS_PATH, PRODUCTS_SNAPSHOT_PATH,
+                       RECIPE_FOOTPRINTS_PATH, RECIPES_PATH, extract_products, ingredient_footprints, load_products,
+                       recipe_totals, save_footprints_source)
+from impact_matrix import INDICATOR_COLUMNS, ImpactMatrix
+from recipe_matrix import build_recipe_matrix, save_recipe_matrix
+
+
+# The Ingredients column holds one "• ..." line per ingredient.
+def split_ingredients(df_recipes):
+    lines = df_recipes['Ingredients'].fillna('').str.split('\n').explode().str.strip()
+    lines = lines[lines != '']
+    return lines.index.to_numpy(), lines.tolist()
+
+
+def build_footprints(recipes_path=RECIPES_PATH, products_path=PRODUCTS_PATH):
+    start = time.perf_counter()
+    df_extracted = extract_products(load_products(products_path))
+    df_recipes = pd.read_csv(recipes_path)
+    recipe_ids, ingredients = split_ingredients(df_recipes)
+    print(f'{len(df_recipes)} recipes, {len(ingredients)} ingredient lines')
+
+    matcher = BatchMatcher(df_extracted['LCI Name'])
+    matches = match_ingredients(ingredients, matcher)
+    print(f'Matched in {time.perf_counter() - start:.1f} s')
+
+    df_ingredients = ingredient_footprints(recipe_ids, ingredients, matches, ImpactMatrix(df_extracted))
+    df_totals = recipe_totals(df_ingredients).reindex(np.arange(len(df_recipes)))
+    df_totals.insert(0, 'Title', df_recipes['Title'].to_numpy())
+    df_totals[['n_ingredients', 'n_quantified']] = df_totals[['n_ingredients', 'n_quantified']].fillna(0).astype(np.int64)
+    df_totals.index.name = 'recipe_id'
+
+    os.makedirs(FOOTPRINTS_DIR, exist_ok=True)
+    df_ingredients.to_parquet(INGREDIENT_FOOTPRINTS_PATH, index=False)
+    df_totals.reset_index().to_parquet(RECIPE_FOOTPRINTS_PATH, index=False)
+    save_recipe_matrix(build_recipe_matrix(df_ingredients, len(df_recipes), len(df_extracted)))
+    df_extracted[['LCI Name', *INDICATOR_COLUMNS]].to_parquet(PRODUCTS_SNAPSHOT_PATH, index=False)
+    save_product_weights(df_ingredients)
+    save_footprints_source(recipes_path)
+    print(f'Footprint tables written to {FOOTPRINTS_DIR} in {time.perf_counter() - start:.1f} s')
+    return df_ingredients, df_totals
+
+
+if __name__ == '__main__':
+    build_footprints(*sys.argv[1:3])
@@ -0,0 +1,140 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from impact_matrix import INDICATOR_NAMES, INDICATORS
+from ingredient_parser import parse_ingredients
+# The paths live in paths.py (no dependencies); they are still importable from here.
+from paths import (FOOTPRINTS_DIR, FOOTPRINTS_SOURCE_PATH, INGREDIENT_FOOTPRINTS_PATH,  # noqa: F401
+                   PRODUCTS_PATH, PRODUCTS_SNAPSHOT_PATH, RECIPE_FOOTPRINTS_PATH, RECIPES_PATH)
+
+CO2_COLUMN = INDICATORS['co2']
+SINGLE_EF_COLUMN = INDICATORS['single_ef']
+
+################################# Products
+
+# Food subgroups of the AGRIBALYSE dataset that can be recipe ingredients.
+FOOD_SUBGROUPS = ['Special Products', 'Herbs', 'Miscellaneous Ingredients', 'Spices','Sels', 'Condiments','Fruits', 'Nuts And Oilseeds',
+       'Vegetables', 'Potatoes And Other Tubers', 'Legumes', 'Cheeses','Creams And Cream Specialties',
+       'Milks', 'Butters', 'Vegetable Oils And Fats', 'Other Fats',
+       'Fish Oils', 'Margarines', 'Pasta, Rice And Cereals',
+       'Flours And Pastry',
+       'Chocolates And Chocolate Products',
+       'Jams And Similar', 'Sugars, Honeys And Similar',
+       'Fish And Seafood Products', 'Cooked Meats', 'Raw Meats',
+       'Raw Fish', 'Deli Meats', 'Cooked Fish', 'Other Meat Products',
+       'Meat Substitutes', 'Cooked Shellfish', 'Raw Shellfish', 'Eggs',
+       'Deli Substitutes']
+
+
+def load_products(path=PRODUCTS_PATH):
+    return pd.read_csv(path, index_col=0)
+
+
+# Extracting the products that can be matched to the ingredients of a recipe
+def extract_products(df_products):
+    df_extracted = df_products.set_index('Food Subgroup')
+    df_extracted = df_extracted.loc[FOOD_SUBGROUPS]
+    df_extracted.reset_index(inplace=True)
+    df_extracted['LCI Name'] = df_extracted['LCI Name'].astype(str)
+    return df_extracted
+
+################################# Quantities
+
+# Kilograms per unit of measurement (canonical unit names of ingredient_parser)
+CONVERSION_FACTORS = {
+    'clove': 0.005,
+    'small': 0.01,
+    'large': 0.05,
+    'gram': 0.001,
+    'kilogram': 1,
+    'milligram': 0.000001,
+    # Assume water density of 1 g/ml
+    'milliliter': 0.001,
+    'liter': 1,
+    'ounce': 0.028,
+    'pound': 0.453592,
+    'tablespoon': 0.015,
+    'teaspoon': 0.005,
+    'cup': 0.24,
+    'can': 0.4,
+    'jar': 0.5,
+    'bottle': 0.5,
+    'package': 1,
+    'pinch': 0.001,
+    'piece': 1,
+    'slice': 0.03,
+    'bunch': 1,
+}
+
+
+# Quantities in kg for Series of quantities and units. Unknown units weigh 0,
+# missing quantities stay NaN.
+def convert_quantity(quantity, unit):
+    return quantity * unit.map(CONVERSION_FACTORS).fillna(0)
+
+################################# Footprints
+
+# One row per ingredient line: the matched LCI product, the parsed quantity
+# and the impact of that quantity on each indicator (co2, single_ef, ...).
+# matches are (LCI Name, score, index in df_extracted) tuples, see batch_matcher;
+# impacts is the ImpactMatrix of df_extracted. Unmatched lines (index -1) keep
+# their quantity but weigh nothing.
+def ingredient_footprints(recipe_ids, ingredients, matches, impacts):
+    parsed = parse_ingredients(list(ingredients))
+    lci_index = np.array([match[2] for match in matches], dtype=np.int64)
+
+    df = pd.DataFrame({
+        'recipe_id': np.asarray(recipe_ids, dtype=np.int64),
+        'ingredient': list(ingredients),
+        'lci_index': lci_index,
+        'lci_name': [match[0] for match in matches],
+        'score': np.array([match[1] for match in matches], dtype=np.float64),
+        'quantity': parsed['quantity'].to_numpy(),
+        'unit': parsed['unit'].to_numpy(),
+    })
+    df['quantity_kg'] = convert_quantity(df['quantity'], df['unit'])
+
+    df[INDICATOR_NAMES] = impacts.impacts(lci_index, df['quantity_kg'].to_numpy())
+    return df
+
+
+# Per-recipe totals of every indicator (only ingredients with a quantity count).
+def recipe_totals(df_ingredients):
+    totals = df_ingredients.groupby('recipe_id').agg(
+        **{indicator: (indicator, 'sum') for indicator in INDICATOR_NAMES},
+        n_ingredients=('ingredient', 'size'),
+        n_quantified=('quantity_kg', 'count'),
+    )
+    return totals
+
+
+def save_footprints_source(csv_path=RECIPES_PATH, source_path=FOOTPRINTS_SOURCE_PATH):
+    from match_cache import file_hash
+    with open(source_path, 'w') as file:
+        json.dump({'recipes_csv': file_hash(csv_path)}, file)
+
+
+# Whether the footprint tables were computed from this version of the recipes CSV.
+def footprints_match_recipes(csv_path=RECIPES_PATH, source_path=FOOTPRINTS_SOURCE_PATH):
+    from match_cache import file_hash
+    if not (os.path.exists(source_path) and os.path.exists(csv_path)):
+        return False
+    with open(source_path) as file:
+        return json.load(file).get('recipes_csv') == file_hash(csv_path)
+
+
+# Loads the table written by build_footprints.py, indexed by recipe id, so
+# the footprint of a recipe is a keyed lookup. Returns (None, None) if the
+# table has not been built yet, or was built from another recipes CSV.
+def load_footprints(ingredients_path=INGREDIENT_FOOTPRINTS_PATH, recipes_path=RECIPE_FOOTPRINTS_PATH,
+                    csv_path=RECIPES_PATH, source_path=FOOTPRINTS_SOURCE_PATH):
+    if not (os.path.exists(ingredients_path) and os.path.exists(recipes_path)):
+        return None, None
+    if not footprints_match_recipes(csv_path, source_path):
+        return None, None
+    df_ingredients = pd.read_parquet(ingredients_path).set_index('recipe_id').sort_index()
+    df_recipes = pd.read_parquet(recipes_path).set_index('recipe_id').sort_index()
+    return df_ingredients, df_recipes
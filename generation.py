@@ -0,0 +1,92 @@
+# Decoding loop of the recipe generation, shared by the Keras model
+# (recipe_generator.py) and the NumPy engine (numpy_lstm.py). It does not
+# depend on TensorFlow: the engines only provide the sampling step.
+import numpy as np
+
+from recipes import STOP_WORD_TITLE
+
+# Indicator of the end of the recipe (the padding of the training recipes).
+STOP_SIGN = '␣'
+
+# Characters generated between two updates of a streaming consumer.
+STREAM_CHUNK_SIZE = 20
+
+RECIPE_LENGTH = 1000
+TRY_TEMPERATURES = [1.0, 0.8]
+
+# Keywords offered on the RNN page, up to MAX_KEYWORDS at a time.
+KEYWORDS = ['Soup', 'Salad', 'Meat', 'Cake', 'Vegetable', 'Mushroom', 'Apple', 'Berries', 'Chicken', 'Tofu',
+            'Chickpeas']
+MAX_KEYWORDS = 2
+
+
+# Start strings tried for the keywords (up to 2) selected by the user.
+def try_letters(input_letters):
+    return ['', '\n', 'A', 'B', 'C', *input_letters[:2]]
+
+
+# (start string, temperature) of every candidate of generate_combinations.
+def combinations(input_letters):
+    return [(letter, temperature) for letter in try_letters(input_letters) for temperature in TRY_TEMPERATURES]
+
+
+def pad_start_strings(start_strings):
+    return [STOP_WORD_TITLE + start_string for start_string in start_strings]
+
+
+# Generates one text per prompt in a single batch. sample(input_indices)
+# feeds the (batch, 1) input indices to the model and returns the sampled
+# next index of every row; index_to_char decodes them.
+# Yields (chunks, finished): the padded start strings first, then a list with
+# the new characters of every row, every chunk_size steps; finished tells
+# which rows are complete.
+#
+# Start strings of different lengths are fed one character per step: a row
+# only starts sampling once its start string has been read. It stops at the
+# stop sign (not included in the text) or after num_generate characters, and
+# the loop ends as soon as every row has stopped.
+def iter_decode(sample, padded_start_strings, prompts, index_to_char, stop_index, num_generate=RECIPE_LENGTH,
+                chunk_size=STREAM_CHUNK_SIZE, stop_at_stop_sign=True):
+    finished = np.zeros(len(prompts), dtype=bool)
+    yield list(padded_start_strings), finished.copy()
+
+    prompt_lengths = np.array([len(prompt) for prompt in prompts])
+    prompt_indices = np.zeros((len(prompts), prompt_lengths.max()), dtype=np.int64)
+    for row, prompt in enumerate(prompts):
+        prompt_indices[row, :len(prompt)] = prompt
+
+    rows = np.arange(len(prompts))
+    input_indices = prompt_indices[:, :1]
+    text_generated = [[] for _ in prompts]
+
+    for step in range(1, prompt_lengths.max() + num_generate):
+        predicted_ids = sample(input_indices)
+
+        # Rows still reading their start string get its next character instead.
+        reading = step < prompt_lengths
+        next_ids = np.where(reading, prompt_indices[rows, np.minimum(step, prompt_lengths - 1)], predicted_ids)
+        input_indices = next_ids[:, None]
+
+        if stop_at_stop_sign:
+            finished |= ~reading & (next_ids == stop_index)
+        generating = ~reading & ~finished
+        for row, char in zip(np.flatnonzero(generating), index_to_char[next_ids[generating]]):
+            text_generated[row].append(char)
+        finished |= step - prompt_lengths + 1 >= num_generate
+
+        if finished.all() or step % chunk_size == 0:
+            yield [''.join(chars) for chars in text_generated], finished.copy()
+            text_generated = [[] for _ in prompts]
+        if finished.all():
+            return
+
+    if any(text_generated):
+        yield [''.join(chars) for chars in text_generated], finished.copy()
+
+
+# Full texts of a stream of iter_decode chunks.
+def join_chunks(stream):
+    texts = None
+    for chunks, _ in stream:
+        texts = chunks if texts is None else [text + chunk for text, chunk in zip(texts, chunks)]
+    return texts
@@ -0,0 +1,173 @@
+# Generated recipes served without waiting for the model.
+#
+# The RNN page only takes up to MAX_KEYWORDS of the KEYWORDS, so every
+# possible input is known ahead of time (67 keyword sets). GenerationPool
+# keeps, for each of them, pool_size fresh candidate sets (the recipes of
+# generation.combinations) generated by a background thread: a click takes
+# one at once and the thread refills that pool first. Served sets also go
+# into an LRU cache keyed on (keywords, temperature, seed), so a set can be
+# shown again without generating it (the page redisplays the last one on
+# reruns). A failed generation is logged and retried; stop() ends the thread
+# (a pool replaced by a new model is stopped, see resources.generation_pool).
+#
+# generate(start_strings, temperatures, seed) returns the full texts (see
+# numpy_generator); with the NumPy engine the seed makes a set reproducible.
+import itertools
+import threading
+import traceback
+from collections import OrderedDict
+
+import numpy as np
+
+from generation import KEYWORDS, MAX_KEYWORDS, RECIPE_LENGTH, combinations
+
+# Fresh candidate sets kept per keyword set.
+POOL_SIZE = 2
+# (keywords, temperature, seed) entries of the LRU cache.
+CACHE_SIZE = 512
+# Seconds before a failed generation is retried.
+RETRY_SECONDS = 5
+
+
+# Every keyword set the page can ask for, as normalized by keyword_key.
+def keyword_sets(keywords=KEYWORDS, max_keywords=MAX_KEYWORDS):
+    return [combination for size in range(max_keywords + 1)
+            for combination in itertools.combinations(keywords, size)]
+
+
+# The selection as a key: the first max_keywords keywords (the only ones
+# used, see generation.try_letters), in the order of KEYWORDS.
+def keyword_key(input_letters, max_keywords=MAX_KEYWORDS):
+    selected = list(input_letters)[:max_keywords]
+    return tuple(sorted(selected, key=lambda keyword: KEYWORDS.index(keyword) if keyword in KEYWORDS else -1))
+
+
+# generate function of the pool for the NumPy engine (thread-safe: the state
+# is not kept in the model).
+def numpy_generator(model, num_generate=RECIPE_LENGTH):
+    from numpy_lstm import generate_batch
+
+    def generate(start_strings, temperatures, seed):
+        return generate_batch(model, start_strings, temperatures, num_generate, seed=seed)
+    return generate
+
+
+class RecipeCache:
+    # LRU cache of thread-safe get / put, bounded to max_entries.
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class GenerationPool:
+
+    def __init__(self, generate, pool_size=POOL_SIZE, cache_size=CACHE_SIZE, keywords=None, seed=None):
+        self.generate = generate
+        self.pool_size = pool_size
+        self.cache = RecipeCache(cache_size)
+        self._pools = {key: [] for key in (keyword_sets() if keywords is None else keywords)}
+        # Keyword sets to refill, most urgent first (the ones just taken).
+        self._queue = list(self._pools)
+        self._seeds = np.random.default_rng(seed)
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.errors = 0
+
+    # Starts the background refill (once).
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refill, daemon=True)
+            self._thread.start()
+        return self
+
+    # Stops the background refill after the set being generated, if any
+    # (the sets ready are still served).
+    def stop(self):
+        with self._condition:
+            self._stopped.set()
+            self._condition.notify_all()
+
+    # Candidate sets ready to be served, over all the keyword sets.
+    def __len__(self):
+        with self._condition:
+            return sum(map(len, self._pools.values()))
+
+    # (seed, [(start string, temperature, text), ...]) of a fresh candidate set
+    # for the selection, or None if its pool is empty (the caller generates
+    # inline). The pool is refilled asynchronously.
+    def take(self, input_letters):
+        key = keyword_key(input_letters)
+        with self._condition:
+            pool = self._pools.get(key)
+            if not pool:
+                return None
+            seed, candidates = pool.pop(0)
+            if key in self._queue:
+                self._queue.remove(key)
+            self._queue.insert(0, key)
+            self._condition.notify()
+        self.put(key, seed, candidates)
+        return seed, candidates
+
+    # Adds a served candidate set to the LRU cache, one entry per temperature.
+    def put(self, input_letters, seed, candidates):
+        key = keyword_key(input_letters)
+        for temperature, group in itertools.groupby(sorted(candidates, key=lambda candidate: candidate[1]),
+                                                    key=lambda candidate: candidate[1]):
+            self.cache.put((key, temperature, seed), [(letter, text) for letter, _, text in group])
+
+    # [(start string, text), ...] of a candidate set served before, or None.
+    def get(self, input_letters, temperature, seed):
+        return self.cache.get((keyword_key(input_letters), temperature, seed))
+
+    # Next keyword set to refill, None once stopped.
+    def _next_key(self):
+        with self._condition:
+            while not self._stopped.is_set():
+                for key in self._queue:
+                    if len(self._pools[key]) < self.pool_size:
+                        return key
+                self._condition.wait()
+            return None
+
+    def _refill(self):
+        while (key := self._next_key()) is not None:
+            seed = int(self._seeds.integers(2**31))
+            letters, temperatures = zip(*combinations(key))
+            try:
+                texts = self.generate(list(letters), list(temperatures), seed)
+            except Exception:
+                self.errors += 1
+                traceback.print_exc()
+                self._stopped.wait(RETRY_SECONDS)
+                continue
+            with self._condition:
+                self._pools[key].append((seed, list(zip(letters, temperatures, texts))))
+                if len(self._pools[key]) >= self.pool_size and key in self._queue:
+                    # Full: back to the end of the queue
+                    self._queue.remove(key)
+                    self._queue.append(key)
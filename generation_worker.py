@@ -0,0 +1,288 @@
+# Recipe generation worker: one process owns the model and serves the
+# generation requests of every Streamlit session over a local socket
+# (multiprocessing.connection), instead of each session generating inline.
+#
+# Requests waiting at the same time are merged into one batch: the batcher
+# takes the first request in the queue, then keeps adding requests until the
+# batch has max_batch_size rows or max_wait seconds have passed, and runs
+# them through the model together (recipe_generator.iter_generate_batch).
+# Every request gets its own rows of the stream back, as they are produced,
+# and is closed as soon as its rows are complete.
+#
+# A request is a list of start strings with their temperatures, and the
+# stream is the one of recipe_generator.iter_generate_batch: the padded start
+# strings, then (chunks, finished) every chunk_size characters.
+# Requests arriving while a batch runs wait for the next one.
+#
+# Messages are pickled, so only clients holding the authkey are served: the
+# GENERATION_WORKER_AUTHKEY environment variable, or else a random key the
+# worker writes to AUTHKEY_PATH (readable by its user only) on first start.
+#
+# Usage: python generation_worker.py [model path] [--max-batch-size N] [--max-wait-ms N] [--port N]
+import os
+import queue
+import secrets
+import socket
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener, answer_challenge, deliver_challenge
+
+import numpy as np
+
+from generation import RECIPE_LENGTH, combinations
+from paths import MODEL_PATH
+
+HOST = 'localhost'
+PORT = 6010
+AUTHKEY_PATH = 'data/cache/generation_worker.key'
+
+MAX_BATCH_SIZE = 32
+MAX_WAIT_SECONDS = 0.02
+# Connections waiting to be accepted (sessions clicking at the same time).
+LISTEN_BACKLOG = 64
+
+################################# Authentication
+
+# The authkey from the environment or the key file; None when neither is
+# set, unless create, which writes a new random key file.
+def load_authkey(path=AUTHKEY_PATH, create=False):
+    if os.environ.get('GENERATION_WORKER_AUTHKEY'):
+        return os.environ['GENERATION_WORKER_AUTHKEY'].encode()
+    try:
+        with open(path, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        if not create:
+            return None
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    authkey = secrets.token_hex(32).encode()
+    with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as file:
+        file.write(authkey)
+    return authkey
+
+################################# Worker
+
+class _Request:
+
+    def __init__(self, message):
+        self.start_strings = list(message['start_strings'])
+        self.temperatures = list(message['temperatures'])
+        self.num_generate = message.get('num_generate', RECIPE_LENGTH)
+        self.stop_at_stop_sign = message.get('stop_at_stop_sign', True)
+        # Stream messages for the connection; None closes it.
+        self.replies = queue.Queue()
+
+    def __len__(self):
+        return len(self.start_strings)
+
+
+# Runs the model on merged batches. Engines with an explicit state (NumPy,
+# TFLite) take any batch size; the stateful Keras model is built for a fixed
+# one, so batches are padded to the next power of two (one model per size).
+class GenerationEngine:
+
+    def __init__(self, path=MODEL_PATH, max_batch_size=MAX_BATCH_SIZE):
+        self.path = path
+        self.max_batch_size = max_batch_size
+        if path.endswith('.npz'):
+            from numpy_lstm import NumpyLSTM, iter_generate_batch
+            self.model = NumpyLSTM(path)
+        else:
+            from recipe_generator import iter_generate_batch, load_model
+            self.model = load_model(path, batch_size=1)
+        self._iter_generate_batch = iter_generate_batch
+        self._keras_models = {}
+
+    @property
+    def fixed_batch_size(self):
+        return not hasattr(self.model, 'step')
+
+    def _keras_model(self, batch_size):
+        if batch_size not in self._keras_models:
+            from recipe_generator import load_model
+            self._keras_models[batch_size] = load_model(self.path, batch_size)
+        return self._keras_models[batch_size]
+
+    def iter_generate_batch(self, start_strings, temperatures, num_generate, stop_at_stop_sign):
+        model = self.model
+        if self.fixed_batch_size:
+            # A request larger than max_batch_size runs alone at its own size.
+            batch_size = max(len(start_strings), min(1 << (len(start_strings) - 1).bit_length(), self.max_batch_size))
+            model = self._keras_model(batch_size)
+            # The padding rows are dropped (run_batch stops once the real rows are done).
+            padding = batch_size - len(start_strings)
+            start_strings = list(start_strings) + [''] * padding
+            temperatures = list(temperatures) + [1.0] * padding
+        return self._iter_generate_batch(model, start_strings, temperatures, num_generate,
+                                         stop_at_stop_sign=stop_at_stop_sign)
+
+
+# Runs one merged batch and sends every request its rows. The batch runs up
+# to the longest num_generate; the rows of shorter requests are cut at their
+# own limit, and the generation stops once every request is complete.
+def run_batch(engine, requests):
+    start_strings = [start_string for request in requests for start_string in request.start_strings]
+    temperatures = [temperature for request in requests for temperature in request.temperatures]
+    bounds = np.cumsum([0] + [len(request) for request in requests])
+    limits = np.concatenate([np.full(len(request), request.num_generate) for request in requests])
+    generated = np.zeros(len(start_strings), dtype=np.int64)
+    open_requests = set(range(len(requests)))
+
+    stream = engine.iter_generate_batch(start_strings, temperatures, int(limits.max()),
+                                        requests[0].stop_at_stop_sign)
+    first = True
+    for chunks, finished in stream:
+        finished = finished[:len(start_strings)]
+        if not first:
+            chunks = [chunk[:max(limit - count, 0)] for chunk, limit, count in zip(chunks, limits, generated)]
+            generated += [len(chunk) for chunk in chunks]
+            finished = finished | (generated >= limits)
+        first = False
+        for index in list(open_requests):
+            rows = slice(bounds[index], bounds[index + 1])
+            requests[index].replies.put((chunks[rows], finished[rows]))
+            if finished[rows].all():
+                requests[index].replies.put(None)
+                open_requests.discard(index)
+        if not open_requests:
+            stream.close()
+            return
+
+    for index in open_requests:
+        requests[index].replies.put(None)
+
+
+class GenerationWorker:
+
+    def __init__(self, engine, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT_SECONDS):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        # Request taken from the queue that did not fit in the last batch.
+        self._pending = None
+        self.n_batches = 0
+        self.n_requests = 0
+
+    # Blocks for the first request, then collects the others waiting within
+    # max_wait, up to max_batch_size rows (a larger request runs alone). A
+    # request that does not fit, or does not share the stop sign setting of
+    # the batch, opens the next one.
+    def next_batch(self):
+        first = self.requests.get() if self._pending is None else self._pending
+        self._pending = None
+        batch, rows = [first], len(first)
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch_size:
+            try:
+                request = self.requests.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if (rows + len(request) > self.max_batch_size
+                    or request.stop_at_stop_sign != first.stop_at_stop_sign):
+                self._pending = request
+                break
+            batch.append(request)
+            rows += len(request)
+        return batch
+
+    def run_batches(self):
+        while True:
+            batch = self.next_batch()
+            try:
+                run_batch(self.engine, batch)
+            except Exception as error:
+                for request in batch:
+                    request.replies.put(('error', repr(error)))
+                    request.replies.put(None)
+            self.n_batches += 1
+            self.n_requests += len(batch)
+
+    # One thread per connection: authenticates the client (here rather than
+    # in accept, so a slow client does not hold up the others), reads the
+    # request, queues it and forwards its stream.
+    def handle(self, connection, authkey):
+        with connection:
+            try:
+                deliver_challenge(connection, authkey)
+                answer_challenge(connection, authkey)
+            except (AuthenticationError, EOFError, OSError):
+                # Wrong authkey, port scan...
+                return
+            try:
+                message = connection.recv()
+                if message == 'ping':
+                    connection.send('pong')
+                    return
+                request = _Request(message)
+                self.requests.put(request)
+                while (reply := request.replies.get()) is not None:
+                    connection.send(reply)
+                connection.send(None)
+            except (EOFError, OSError):
+                # The session went away; its rows are still generated.
+                pass
+
+    def serve(self, host=HOST, port=PORT, authkey=None):
+        authkey = authkey or load_authkey(create=True)
+        threading.Thread(target=self.run_batches, daemon=True).start()
+        # No authkey on the listener: the handshake runs in the connection's thread.
+        with Listener((host, port), backlog=LISTEN_BACKLOG) as listener:
+            print(f'Generation worker listening on {host}:{port} '
+                  f'(max batch size {self.max_batch_size}, max wait {self.max_wait * 1000:.0f} ms)')
+            while True:
+                try:
+                    connection = listener.accept()
+                except OSError:
+                    continue
+                threading.Thread(target=self.handle, args=(connection, authkey), daemon=True).start()
+
+################################# Client
+
+# True if a worker is listening and its authkey is known (checked with a
+# short timeout, so the app falls back to generating inline quickly).
+def worker_available(host=HOST, port=PORT, timeout=0.2):
+    if load_authkey() is None:
+        return False
+    try:
+        socket.create_connection((host, port), timeout=timeout).close()
+    except OSError:
+        return False
+    return True
+
+
+# Same stream as recipe_generator.iter_generate_batch, generated by the worker.
+def iter_generate_batch(start_strings, temperatures, num_generate=RECIPE_LENGTH, stop_at_stop_sign=True,
+                        host=HOST, port=PORT, authkey=None):
+    authkey = authkey or load_authkey()
+    if authkey is None:
+        raise AuthenticationError(f'No generation worker authkey (set GENERATION_WORKER_AUTHKEY or start the '
+                                  f'worker to create {AUTHKEY_PATH})')
+    with Client((host, port), authkey=authkey) as connection:
+        connection.send({'start_strings': list(start_strings), 'temperatures': list(temperatures),
+                         'num_generate': num_generate, 'stop_at_stop_sign': stop_at_stop_sign})
+        while (reply := connection.recv()) is not None:
+            if reply[0] == 'error':
+                raise RuntimeError(f'Generation worker failed: {reply[1]}')
+            yield reply
+
+
+def iter_combinations(input_letters, recipe_length=RECIPE_LENGTH, **address):
+    letters, temperatures = zip(*combinations(input_letters))
+    return iter_generate_batch(letters, temperatures, recipe_length, **address)
+
+
+def _option(args, name, default):
+    return type(default)(args[args.index(name) + 1]) if name in args else default
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    paths = [arg for index, arg in enumerate(args) if not arg.startswith('--')
+             and (index == 0 or not args[index - 1].startswith('--'))]
+    max_batch_size = _option(args, '--max-batch-size', MAX_BATCH_SIZE)
+    engine = GenerationEngine(paths[0] if paths else MODEL_PATH, max_batch_size)
+    worker = GenerationWorker(engine, max_batch_size, _option(args, '--max-wait-ms', MAX_WAIT_SECONDS * 1000) / 1000)
+    worker.serve(port=_option(args, '--port', PORT))
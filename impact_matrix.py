@@ -0,0 +1,65 @@
+# Dense products x indicators matrix of the AGRIBALYSE impacts (per kg of
+# product) with an LCI Name -> row lookup. Every footprint in the app is
+# computed from it: the impacts of a list of (product, kg) pairs are one
+# matrix-vector product over the six indicators at once.
+import numpy as np
+import pandas as pd
+
+# The six impact indicators of the dataset, by short name.
+INDICATORS = {
+    'single_ef': 'Single EF 3.1 score (mPt/kg product)',
+    'co2': 'Climate change (kg CO2 eq/kg product)',
+    'water': 'Water resource depletion (m3 depriv./kg product)',
+    'toxicity_non_carcinogens': 'Toxicological effects on human health: non-carcinogens (CTUh/kg product)',
+    'toxicity_carcinogens': 'Toxicological effects on human health: carcinogenic substances (CTUh/kg product)',
+    'land_use': 'Land use (Pt/kg product)',
+}
+INDICATOR_NAMES = list(INDICATORS)
+INDICATOR_COLUMNS = list(INDICATORS.values())
+
+
+class ImpactMatrix:
+
+    # df_products: the products table (or df_extracted); rows keep its order,
+    # so row i of the matrix is row i of the table.
+    def __init__(self, df_products):
+        self.names = df_products['LCI Name'].astype(str).to_numpy()
+        self.matrix = np.ascontiguousarray(df_products[INDICATOR_COLUMNS].to_numpy(np.float64))
+        # First row of every name (a few names appear more than once)
+        self._rows = {}
+        for row, name in enumerate(self.names):
+            self._rows.setdefault(name, row)
+
+    def __len__(self):
+        return len(self.names)
+
+    def row(self, name):
+        return self._rows[name]
+
+    # Rows of the names, -1 for unknown names.
+    def rows(self, names):
+        return np.array([self._rows.get(name, -1) for name in names], dtype=np.int64)
+
+    def column(self, indicator):
+        return self.matrix[:, INDICATOR_NAMES.index(indicator)]
+
+    # Impacts of every (product, kg) pair, shape (n, 6). NaN kg and unknown
+    # products (row -1) count as 0.
+    def impacts(self, product_ids, kg):
+        product_ids, kg = _pairs(product_ids, kg)
+        return self.matrix[product_ids] * kg[:, None]
+
+    # Total of the six indicators for the (product, kg) pairs.
+    def footprint(self, product_ids, kg):
+        product_ids, kg = _pairs(product_ids, kg)
+        return kg @ self.matrix[product_ids]
+
+    # One labelled row of totals, e.g. for st.write / st.metric.
+    def to_series(self, totals):
+        return pd.Series(totals, index=INDICATOR_COLUMNS)
+
+
+def _pairs(product_ids, kg):
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    kg = np.nan_to_num(np.asarray(kg, dtype=np.float64))
+    return product_ids.clip(min=0), np.where(product_ids < 0, 0, kg)
@@ -0,0 +1,121 @@
+# Rolls a new revision of the AGRIBALYSE dataset (or a new FOOD_SUBGROUPS
+# list) out to the footprint tables of build_footprints.py without
+# rebuilding the whole corpus.
+#
+# The products of the last build are compared to the current df_extracted
+# by LCI Name:
+#   - changed impacts: the matches stay, only the recipes using the product
+#     (found with the reverse index, the CSC form of the recipe matrix) get
+#     new totals;
+#   - added or removed products: the matcher's IDF weights depend on the
+#     whole catalogue, so scores of the old and new catalogue cannot be
+#     compared. Every ingredient line is scored again with the new matcher
+#     (once per distinct line), and the recipes with a line whose product
+#     changed get new totals.
+# Then the totals of the affected recipes, the recipe matrix and the
+# snapshot are rewritten and the match cache is seeded with the new matches.
+#
+# Usage: python incremental_update.py [products.csv]
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from autocomplete import save_product_weights
+from batch_matcher import BatchMatcher
+from footprint import (INGREDIENT_FOOTPRINTS_PATH, PRODUCTS_PATH, PRODUCTS_SNAPSHOT_PATH, RECIPE_FOOTPRINTS_PATH,
+                       extract_products, load_products, recipe_totals)
+from impact_matrix import INDICATOR_COLUMNS, INDICATOR_NAMES, ImpactMatrix
+from match_cache import MatchCache
+from recipe_matrix import build_recipe_matrix, load_recipe_matrix, save_recipe_matrix
+
+# Most frequent ingredient lines written to the match cache after an update.
+CACHE_SEED_SIZE = 50_000
+
+
+# LCI names added, removed and with changed impacts between two product
+# tables (LCI Name + indicator columns). Only the first row of a name counts,
+# as in ImpactMatrix.
+def diff_products(df_old, df_new):
+    old = df_old.drop_duplicates('LCI Name').set_index('LCI Name')[INDICATOR_COLUMNS]
+    new = df_new.drop_duplicates('LCI Name').set_index('LCI Name')[INDICATOR_COLUMNS]
+    common = old.index.intersection(new.index)
+    old_values, new_values = old.loc[common].to_numpy(), new.loc[common].to_numpy()
+    differs = ~((old_values == new_values) | (np.isnan(old_values) & np.isnan(new_values))).all(axis=1)
+    return {
+        'added': new.index.difference(old.index).tolist(),
+        'removed': old.index.difference(new.index).tolist(),
+        'changed': common[differs].tolist(),
+    }
+
+
+def update_footprints(products_path=PRODUCTS_PATH):
+    start = time.perf_counter()
+    df_old = pd.read_parquet(PRODUCTS_SNAPSHOT_PATH)
+    df_extracted = extract_products(load_products(products_path))
+    diff = diff_products(df_old, df_extracted)
+    print(', '.join(f'{len(names)} {kind}' for kind, names in diff.items()) + ' products')
+    if not any(diff.values()):
+        return None
+
+    impacts = ImpactMatrix(df_extracted)
+    df_ingredients = pd.read_parquet(INGREDIENT_FOOTPRINTS_PATH)
+    df_totals = pd.read_parquet(RECIPE_FOOTPRINTS_PATH).set_index('recipe_id')
+
+    # Recipes using a product with new impacts, from the reverse index
+    # (columns of the recipe matrix, in the order of the old snapshot).
+    by_product = load_recipe_matrix().tocsc()
+    changed_columns = np.flatnonzero(df_old['LCI Name'].isin(diff['changed']).to_numpy())
+    affected = [by_product.indices[by_product.indptr[column]:by_product.indptr[column + 1]]
+                for column in changed_columns]
+
+    # Row positions shift when products are added or removed.
+    lci_index = impacts.rows(df_ingredients['lci_name'])
+    lci_name = df_ingredients['lci_name'].to_numpy(object)
+    score = df_ingredients['score'].to_numpy(np.float64)
+    rematched = np.zeros(len(df_ingredients), dtype=bool)
+    if diff['added'] or diff['removed']:
+        matcher = BatchMatcher(df_extracted['LCI Name'])
+        new_index, score = matcher.match(df_ingredients['ingredient'].tolist())
+        rematched = new_index != lci_index
+        lci_index = new_index
+
+    lci_name[rematched] = np.where(lci_index[rematched] >= 0, impacts.names[lci_index[rematched].clip(min=0)], '')
+    df_ingredients['lci_index'] = lci_index
+    df_ingredients['lci_name'] = lci_name
+    df_ingredients['score'] = score
+    affected.append(df_ingredients['recipe_id'].to_numpy()[rematched])
+    affected = np.unique(np.concatenate(affected)).astype(np.int64)
+    print(f'{rematched.sum()} ingredient lines matched again, {len(affected)} recipes affected')
+
+    # New impacts and totals for the affected recipes only
+    lines_affected = df_ingredients['recipe_id'].isin(affected).to_numpy()
+    df_ingredients.loc[lines_affected, INDICATOR_NAMES] = impacts.impacts(
+        lci_index[lines_affected], df_ingredients['quantity_kg'].to_numpy()[lines_affected])
+    totals = recipe_totals(df_ingredients[lines_affected])
+    df_totals.loc[totals.index, totals.columns] = totals
+
+    df_ingredients.to_parquet(INGREDIENT_FOOTPRINTS_PATH, index=False)
+    df_totals.reset_index().to_parquet(RECIPE_FOOTPRINTS_PATH, index=False)
+    save_recipe_matrix(build_recipe_matrix(df_ingredients, len(df_totals), len(impacts)))
+    df_extracted[['LCI Name', *INDICATOR_COLUMNS]].to_parquet(PRODUCTS_SNAPSHOT_PATH, index=False)
+    save_product_weights(df_ingredients)
+    seed_match_cache(df_ingredients, products_path)
+    print(f'Footprints updated in {time.perf_counter() - start:.1f} s')
+    return diff
+
+
+# The cache entries of the previous dataset version are dropped when the
+# cache is opened with the new file, so the most frequent lines are written
+# back with their current matches.
+def seed_match_cache(df_ingredients, products_path=PRODUCTS_PATH, size=CACHE_SEED_SIZE):
+    df = df_ingredients.drop_duplicates('ingredient')
+    counts = df_ingredients['ingredient'].value_counts()
+    df = df.set_index('ingredient').loc[counts.index[:size]]
+    MatchCache(products_path).put_many(
+        df.index.tolist(), zip(df['lci_name'], df['score'], df['lci_index']))
+
+
+if __name__ == '__main__':
+    update_footprints(*sys.argv[1:2])
@@ -0,0 +1,167 @@
+# Inverted index from normalized ingredient terms to the sorted ids of the
+# recipes that use them, for the Personal cookbook search.
+#
+# The index is three flat arrays: the sorted terms, an offsets array and the
+# concatenated posting lists, saved as data/ingredient_index.npz.
+#
+# Usage: python ingredient_index.py [recipes.csv]
+import os
+import re
+import sys
+
+import numpy as np
+
+from batch_matcher import STOP_WORDS
+from footprint import RECIPES_PATH
+
+INDEX_PATH = 'data/ingredient_index.npz'
+
+# The cookbook searches for up to 5 ingredients.
+MAX_QUERY_INGREDIENTS = 5
+PAGE_SIZE = 20
+
+
+# tomatoes -> tomato, berries -> berry, eggs -> egg (but not "swiss" -> "swis")
+def normalize_term(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 4 and word.endswith('oes'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+# Normalized terms of an ingredient line or a query ingredient.
+def ingredient_terms(text):
+    words = re.findall(r'[a-z]+', text.lower())
+    return [normalize_term(word) for word in words if word not in STOP_WORDS and len(word) > 1]
+
+
+class IngredientIndex:
+
+    def __init__(self, terms, offsets, postings, ingredient_counts):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        # Number of ingredient lines of every recipe, used for ranking.
+        self.ingredient_counts = ingredient_counts
+
+    def __len__(self):
+        return len(self.ingredient_counts)
+
+    @classmethod
+    def build(cls, ingredient_blocks):
+        vocabulary = {}
+        term_ids, recipe_ids, ingredient_counts = [], [], []
+        for recipe_id, block in enumerate(ingredient_blocks):
+            lines = [line for line in block.split('\n') if line.strip()]
+            ingredient_counts.append(len(lines))
+            for term in set(term for line in lines for term in ingredient_terms(line)):
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                recipe_ids.append(recipe_id)
+
+        # Renumber the terms in sorted order so a term is found with searchsorted.
+        terms = np.array(sorted(vocabulary), dtype=str)
+        rank = np.empty(len(vocabulary), dtype=np.int64)
+        rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+
+        term_ids = rank[np.asarray(term_ids, dtype=np.int64)]
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int32)
+        order = np.lexsort((recipe_ids, term_ids))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=offsets[1:])
+        return cls(terms, offsets, recipe_ids[order], np.asarray(ingredient_counts, dtype=np.int32))
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as data:
+            return cls(data['terms'], data['offsets'], data['postings'], data['ingredient_counts'])
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, terms=self.terms, offsets=self.offsets, postings=self.postings,
+                 ingredient_counts=self.ingredient_counts)
+
+    # Sorted ids of the recipes containing the term.
+    def term_postings(self, term):
+        position = np.searchsorted(self.terms, term)
+        if position == len(self.terms) or self.terms[position] != term:
+            return self.postings[:0]
+        return self.postings[self.offsets[position]:self.offsets[position + 1]]
+
+    # Sorted ids of the recipes containing every term of the ingredient
+    # ("olive oil" needs both "olive" and "oil").
+    def ingredient_postings(self, ingredient):
+        postings = sorted((self.term_postings(term) for term in ingredient_terms(ingredient)), key=len)
+        if not postings:
+            return self.postings[:0]
+        result = postings[0]
+        for other in postings[1:]:
+            result = intersect_sorted(result, other)
+        return result
+
+    # Sorted ids of the recipes containing all (mode='all') or any (mode='any')
+    # of the query ingredients, and how many of them each recipe contains.
+    def matching_ids(self, ingredients, mode='all'):
+        ingredients = [ingredient for ingredient in ingredients if ingredient_terms(ingredient)]
+        ingredients = ingredients[:MAX_QUERY_INGREDIENTS]
+        if not ingredients:
+            return self.postings[:0], np.zeros(0, dtype=np.int64)
+
+        postings = sorted((self.ingredient_postings(ingredient) for ingredient in ingredients), key=len)
+        if mode == 'all':
+            recipe_ids = postings[0]
+            for other in postings[1:]:
+                recipe_ids = intersect_sorted(recipe_ids, other)
+            return recipe_ids, np.full(len(recipe_ids), len(postings))
+        return np.unique(np.concatenate(postings), return_counts=True)
+
+    # Matching recipes (see matching_ids), ranked and paginated. Returns (ids
+    # of the page, total). Ranking: most query ingredients matched first,
+    # then recipes with fewer ingredients (the query makes up more of the
+    # recipe), then by id.
+    def search(self, ingredients, mode='all', page=0, page_size=PAGE_SIZE):
+        recipe_ids, matched = self.matching_ids(ingredients, mode)
+        if not len(recipe_ids):
+            return recipe_ids, 0
+
+        # The three ranking criteria packed into one int64 sort key, so only
+        # the entries up to the requested page need to be ordered.
+        key = ((matched.max() - matched).astype(np.int64) << 48
+               | np.minimum(self.ingredient_counts[recipe_ids], 0xFFFF).astype(np.int64) << 32
+               | recipe_ids.astype(np.int64))
+        start, end = page * page_size, min((page + 1) * page_size, len(key))
+        if start >= end:
+            return self.postings[:0], len(key)
+        top = np.partition(key, end - 1)[:end] if end < len(key) else key.copy()
+        top.sort()
+        return (top[start:end] & 0xFFFFFFFF).astype(np.int32), len(key)
+
+
+# Intersection of two sorted id arrays: every id of the shorter one is looked
+# up in the longer one with a binary search.
+def intersect_sorted(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    if not len(a):
+        return a
+    positions = np.searchsorted(b, a).clip(max=len(b) - 1)
+    return a[b[positions] == a]
+
+
+# Loads the index, building it from the recipe store if it is missing or
+# older than the recipes CSV.
+def open_ingredient_index(recipe_store, csv_path=RECIPES_PATH, path=INDEX_PATH):
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(csv_path):
+        return IngredientIndex.load(path)
+    index = IngredientIndex.build(recipe_store.get('Ingredients', recipe_id) for recipe_id in range(len(recipe_store)))
+    index.save(path)
+    return index
+
+
+if __name__ == '__main__':
+    from recipe_store import open_recipe_store
+
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else RECIPES_PATH
+    open_ingredient_index(open_recipe_store(csv_path), csv_path)
@@ -0,0 +1,106 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Spellings of every unit of measurement, by canonical unit name.
+UNIT_ALIASES = {
+    'bunch': ['bunch', 'bunches'],
+    'clove': ['clove', 'cloves'],
+    'small': ['small'],
+    'large': ['large'],
+    'gram': ['gram', 'grams', 'g', 'gr'],
+    'kilogram': ['kilogram', 'kilograms', 'kg', 'kgs'],
+    'milligram': ['milligram', 'milligrams', 'mg'],
+    'milliliter': ['milliliter', 'milliliters', 'millilitre', 'millilitres', 'ml'],
+    'liter': ['liter', 'liters', 'litre', 'litres', 'l'],
+    'ounce': ['ounce', 'ounces', 'oz'],
+    'pound': ['pound', 'pounds', 'lb', 'lbs'],
+    'tablespoon': ['tablespoon', 'tablespoons', 'tbsp', 'tbsps', 'tbs', 'tbl'],
+    'teaspoon': ['teaspoon', 'teaspoons', 'tsp', 'tsps'],
+    'cup': ['cup', 'cups'],
+    'can': ['can', 'cans'],
+    'jar': ['jar', 'jars'],
+    'bottle': ['bottle', 'bottles'],
+    'package': ['package', 'packages', 'pkg'],
+    'pinch': ['pinch', 'pinches'],
+    'piece': ['piece', 'pieces'],
+    'slice': ['slice', 'slices'],
+}
+UNITS = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+UNICODE_FRACTIONS = {
+    '½': 1 / 2, '⅓': 1 / 3, '⅔': 2 / 3, '¼': 1 / 4, '¾': 3 / 4, '⅕': 1 / 5, '⅖': 2 / 5, '⅗': 3 / 5,
+    '⅘': 4 / 5, '⅙': 1 / 6, '⅚': 5 / 6, '⅛': 1 / 8, '⅜': 3 / 8, '⅝': 5 / 8, '⅞': 7 / 8,
+}
+_FRACTION_CHARS = ''.join(UNICODE_FRACTIONS)
+
+# A single amount: "1 1/2", "1/2", "1.5", "1½", "1 ½" or "½".
+_NUMBER = (rf'(?:\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?(?:\s*[{_FRACTION_CHARS}])?|[{_FRACTION_CHARS}])')
+# Longest spellings first, so "tablespoons" is not read as "tablespoon" + "s".
+_UNIT = '|'.join(re.escape(alias) for alias in sorted(UNITS, key=len, reverse=True))
+
+# The whole ingredient line in one pass: optional bullet, amount or range
+# ("2-3", "2 to 3"), parenthetical package size ("(8 ounce)", "(8-oz.)"),
+# unit, and the rest of the line. Units must end on a word boundary, so the
+# "g" of "large", "egg" or "ginger" is never taken for grams.
+INGREDIENT_PATTERN = re.compile(
+    rf'''^\s*(?:[•\-*]\s*)?
+    (?P<quantity>{_NUMBER}(?:\s*(?:-|–|to|or)\s*{_NUMBER})?)?\s*
+    (?:\(\s*(?P<package_quantity>{_NUMBER})\s*-?\s*(?P<package_unit>{_UNIT})\b\.?\s*\)\s*)?
+    (?:(?P<unit>{_UNIT})\b\.?)?\s*
+    (?:of\s+)?(?P<remainder>.*?)\s*$''',
+    re.IGNORECASE | re.VERBOSE | re.DOTALL,
+)
+
+# Splits a matched amount into its whole, fraction and unicode fraction parts.
+_NUMBER_PARTS = re.compile(
+    rf'^(?:(?P<whole>\d+(?:\.\d+)?)(?![\d/.])\s*)?(?:(?P<numerator>\d+)/(?P<denominator>\d+))?\s*(?P<unicode>[{_FRACTION_CHARS}])?$')
+_RANGE = re.compile(rf'^(?P<low>{_NUMBER})(?:\s*(?:-|–|to|or)\s*(?P<high>{_NUMBER}))?$', re.IGNORECASE)
+
+
+# Numeric value of a Series of single amounts ("1 1/2" -> 1.5), NaN if empty.
+def amounts_to_float(amounts):
+    parts = amounts.str.extract(_NUMBER_PARTS)
+    whole = pd.to_numeric(parts['whole'], errors='coerce')
+    fraction = (pd.to_numeric(parts['numerator'], errors='coerce')
+                / pd.to_numeric(parts['denominator'], errors='coerce').replace(0, np.nan))
+    unicode_fraction = parts['unicode'].map(UNICODE_FRACTIONS)
+
+    value = whole.fillna(0) + fraction.fillna(0) + unicode_fraction.fillna(0)
+    has_value = whole.notna() | fraction.notna() | unicode_fraction.notna()
+    return value.where(has_value)
+
+
+# Numeric value of a Series of amounts or ranges; ranges count as their midpoint.
+def quantities_to_float(quantities):
+    ranges = quantities.str.extract(_RANGE)
+    low = amounts_to_float(ranges['low'])
+    high = amounts_to_float(ranges['high'])
+    return ((low + high) / 2).fillna(low)
+
+
+# Parses a Series of ingredient lines into (quantity, unit, remainder)
+# columns. quantity is a float (NaN if the line has none), unit is the
+# canonical unit name from UNIT_ALIASES (NaN if none).
+def parse_ingredients(ingredients):
+    ingredients = pd.Series(ingredients, dtype=object).fillna('').astype(str)
+    # Corpus lines repeat a lot, so every distinct line is parsed only once.
+    codes, unique = pd.factorize(ingredients)
+    parsed = pd.Series(unique, dtype=object).str.extract(INGREDIENT_PATTERN)
+
+    quantity = quantities_to_float(parsed['quantity'])
+    unit = parsed['unit'].str.lower().map(UNITS)
+
+    # "1 (8 ounce) package" is 8 ounces, not one package.
+    package_quantity = amounts_to_float(parsed['package_quantity'])
+    package_unit = parsed['package_unit'].str.lower().map(UNITS)
+    has_package = package_quantity.notna() & package_unit.notna()
+    quantity = quantity.fillna(1).mul(package_quantity).where(has_package, quantity)
+    unit = package_unit.where(has_package, unit)
+
+    return pd.DataFrame({
+        'quantity': quantity.to_numpy(np.float64)[codes],
+        'unit': unit.to_numpy(object)[codes],
+        'remainder': parsed['remainder'].to_numpy(object)[codes],
+    }, index=ingredients.index)
@@ -0,0 +1,177 @@
+# Lightweight timings and counters of the app's stages (CSV loading,
+# df_extracted, matching, plotting, AgGrid, inference, ...).
+#
+# A run is one rerun of the Streamlit script (or one run of a batch script):
+# start_run() opens it for the current thread (Streamlit reruns every session
+# in its own thread), the stages and counters recorded in that thread go to it,
+# and finish_run() closes it and writes it to the metrics file. Every stage
+# keeps its number of calls, total and max seconds, so a stage timed once per
+# decoding step stays small. Everything is also added to process-wide totals,
+# including what is recorded outside a run (e.g. in background threads).
+#
+#   with stage('matching'):           @timed('load model')
+#       ...                           def load_model(...):
+#   count('characters generated', n)
+#
+# The metrics file is opt-in: with METRICS_PATH set in the environment it
+# gets one JSON line per run (it grows with every rerun, so rotate it), or,
+# for a .prom path, the totals in the Prometheus text format (rewritten after
+# every run, for the node_exporter textfile collector).
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRICS_PATH = os.environ.get('METRICS_PATH', '')
+METRIC_PREFIX = 'cookwise'
+
+
+class Run:
+
+    def __init__(self, name, labels=None):
+        self.name = name
+        self.labels = dict(labels or {})
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.seconds = None
+        # stage -> [calls, total seconds, max seconds]
+        self.stages = defaultdict(lambda: [0, 0.0, 0.0])
+        self.counters = defaultdict(float)
+
+    def record(self, name, seconds):
+        stats = self.stages[name]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def finish(self):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self._start
+        return self
+
+    def to_dict(self):
+        return {
+            'run': self.name,
+            'labels': self.labels,
+            'started': self.started,
+            'seconds': self.seconds,
+            'stages': {name: {'calls': calls, 'seconds': total, 'max_seconds': longest}
+                       for name, (calls, total, longest) in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+
+_local = threading.local()
+_lock = threading.Lock()
+# Process-wide totals of every run and of what is recorded outside runs.
+_totals = Run('process')
+_run_counts = defaultdict(int)
+
+################################# Recording
+
+def start_run(name, **labels):
+    _local.run = Run(name, labels)
+    return _local.run
+
+
+# Run of the current thread, None outside a run.
+def current_run():
+    return getattr(_local, 'run', None)
+
+
+def record(name, seconds):
+    run = current_run()
+    if run is not None:
+        run.record(name, seconds)
+    with _lock:
+        _totals.record(name, seconds)
+
+
+def count(name, value=1):
+    run = current_run()
+    if run is not None:
+        run.count(name, value)
+    with _lock:
+        _totals.count(name, value)
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+# Decorator timing every call of a function as a stage (its name by default).
+def timed(name=None):
+    def decorate(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Closes the run of the current thread and writes it to the metrics file, if
+# any. Returns the run (None outside a run).
+def finish_run(path=METRICS_PATH):
+    run = current_run()
+    if run is None:
+        return None
+    _local.run = None
+    run.finish()
+    with _lock:
+        _run_counts[run.name] += 1
+        if path:
+            _write(run, path)
+    return run
+
+################################# Metrics file
+
+def _write(run, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith('.prom'):
+        # Written aside and renamed, so a scrape never reads half a file.
+        with open(path + '.tmp', 'w') as file:
+            file.write(prometheus_text())
+        os.replace(path + '.tmp', path)
+    else:
+        with open(path, 'a') as file:
+            file.write(json.dumps(run.to_dict()) + '\n')
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Process totals in the Prometheus text exposition format.
+def prometheus_text():
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.extend([f'# HELP {METRIC_PREFIX}_{name} {help_text}', f'# TYPE {METRIC_PREFIX}_{name} {kind}'])
+        lines.extend(f'{METRIC_PREFIX}_{name}{{{label}="{_label(key)}"}} {value}' for label, key, value in samples)
+
+    stages = sorted(_totals.stages.items())
+    metric('runs_total', 'counter', 'Finished runs (app reruns, scripts).',
+           [('run', name, runs) for name, runs in sorted(_run_counts.items())])
+    metric('stage_calls_total', 'counter', 'Calls of each stage.',
+           [('stage', name, calls) for name, (calls, _, _) in stages])
+    metric('stage_seconds_total', 'counter', 'Seconds spent in each stage.',
+           [('stage', name, total) for name, (_, total, _) in stages])
+    metric('events_total', 'counter', 'Counted events.',
+           [('name', name, value) for name, value in sorted(_totals.counters.items())])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Location of the persistent ingredient -> LCI match cache.
+CACHE_PATH = 'data/cache/match_cache.sqlite'
+
+# Name of the matcher the cached matches come from (batch_matcher.py). Bumped
+# when its output changes, so older matches are not served.
+MATCHER = 'ngram-2'
+
+# Number of entries kept in memory (fast path) and on disk before the
+# least recently used ones are evicted.
+MEMORY_CAPACITY = 50_000
+DISK_CAPACITY = 500_000
+
+
+# Lower-cases the ingredient line and removes bullets and repeated spaces, so
+# "• 1 Teaspoon  salt" and "1 teaspoon salt" share the same cache entry.
+def normalize_ingredient(ingredient):
+    ingredient = str(ingredient).replace('•', ' ').lower()
+    return re.sub(r'\s+', ' ', ingredient).strip()
+
+
+# Hash of the products dataset. It is part of every cache key (together with
+# the matcher name), so entries are invalidated when the dataset changes.
+# extra strings (e.g. the food subgroups df_extracted is filtered on) are
+# hashed too, since the stored row indexes depend on them.
+def file_hash(path, extra=(), chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    for value in extra:
+        digest.update(b'\0' + str(value).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class MatchCache:
+    # Two-level LRU cache: an in-memory OrderedDict in front of a SQLite table.
+    # Values are (LCI Name, score, row index in df_extracted) tuples.
+
+    # subgroups are the food subgroups of df_extracted (footprint.FOOD_SUBGROUPS
+    # by default): the row indexes stored in the cache depend on them.
+    def __init__(self, dataset_path, matcher=MATCHER, cache_path=CACHE_PATH,
+                 memory_capacity=MEMORY_CAPACITY, disk_capacity=DISK_CAPACITY, subgroups=None):
+        if subgroups is None:
+            from footprint import FOOD_SUBGROUPS
+            subgroups = FOOD_SUBGROUPS
+        # Matches of different matchers are not interchangeable, so they are kept apart.
+        self.dataset_hash = f'{file_hash(dataset_path, subgroups)}:{matcher}'
+        self.memory_capacity = memory_capacity
+        self.disk_capacity = disk_capacity
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        # Streamlit runs the script in different threads for each session.
+        self._db = sqlite3.connect(cache_path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS matches (
+                dataset_hash TEXT NOT NULL,
+                ingredient TEXT NOT NULL,
+                lci_name TEXT NOT NULL,
+                score REAL NOT NULL,
+                lci_index INTEGER NOT NULL,
+                last_used INTEGER NOT NULL,
+                PRIMARY KEY (dataset_hash, ingredient)
+            )''')
+        self._db.execute('CREATE INDEX IF NOT EXISTS matches_last_used ON matches (last_used)')
+        # Entries of older dataset versions can never be hit again.
+        self._db.execute('DELETE FROM matches WHERE dataset_hash != ?', (self.dataset_hash,))
+        self._db.commit()
+        self._clock = self._db.execute('SELECT COALESCE(MAX(last_used), 0) FROM matches').fetchone()[0]
+        self._disk_entries = self._db.execute('SELECT COUNT(*) FROM matches').fetchone()[0]
+
+    def __len__(self):
+        return self._disk_entries
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate,
+                'memory_entries': len(self._memory), 'disk_entries': len(self)}
+
+    def get(self, ingredient):
+        return self.get_many([ingredient])[0]
+
+    # Looks a batch of ingredients up; the last_used times of the disk hits
+    # are updated in a single transaction.
+    def get_many(self, ingredients):
+        matches, used = [], []
+        with self._lock:
+            for ingredient in ingredients:
+                matches.append(self._lookup(normalize_ingredient(ingredient), used))
+            if used:
+                self._db.executemany('UPDATE matches SET last_used = ? WHERE dataset_hash = ? AND ingredient = ?',
+                                     used)
+                self._db.commit()
+        return matches
+
+    def put(self, ingredient, match):
+        self.put_many([ingredient], [match])
+
+    # Stores a batch of matches in a single transaction.
+    def put_many(self, ingredients, matches):
+        with self._lock:
+            for ingredient, (lci_name, score, lci_index) in zip(ingredients, matches):
+                key = normalize_ingredient(ingredient)
+                match = (str(lci_name), float(score), int(lci_index))
+                self._clock += 1
+                inserted = self._db.execute(
+                    'INSERT OR IGNORE INTO matches VALUES (?, ?, ?, ?, ?, ?)',
+                    (self.dataset_hash, key, *match, self._clock)).rowcount
+                if not inserted:
+                    self._db.execute(
+                        'UPDATE matches SET lci_name = ?, score = ?, lci_index = ?, last_used = ? '
+                        'WHERE dataset_hash = ? AND ingredient = ?',
+                        (*match, self._clock, self.dataset_hash, key))
+                self._disk_entries += inserted
+                self._remember(key, match)
+            if self._disk_entries > self.disk_capacity:
+                self._evict()
+            self._db.commit()
+
+    # Returns the cached match, or computes it with match_fn(ingredient) and stores it.
+    def get_or_match(self, ingredient, match_fn):
+        match = self.get(ingredient)
+        if match is None:
+            match = match_fn(ingredient)
+            self.put(ingredient, match)
+        return match
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute('DELETE FROM matches')
+            self._db.commit()
+            self._disk_entries = 0
+
+    # Memory first, then disk; disk hits append their last_used update to used.
+    def _lookup(self, key, used):
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        row = self._db.execute(
+            'SELECT lci_name, score, lci_index FROM matches WHERE dataset_hash = ? AND ingredient = ?',
+            (self.dataset_hash, key)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._clock += 1
+        used.append((self._clock, self.dataset_hash, key))
+        self._remember(key, row)
+        return row
+
+    def _remember(self, key, match):
+        self._memory[key] = match
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_capacity:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        # Drops the least recently used tenth of the table in one statement.
+        excess = self._disk_entries - self.disk_capacity + self.disk_capacity // 10
+        self._db.execute('''DELETE FROM matches WHERE rowid IN (
+            SELECT rowid FROM matches ORDER BY last_used LIMIT ?)''', (excess,))
+        self._disk_entries -= excess
+
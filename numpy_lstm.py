@@ -0,0 +1,193 @@
+# NumPy inference engine for the recipe generation model
+# (Embedding -> LSTM(1024) -> Dense, see recipe_generator.build_model), so
+# the app can generate recipes without loading TensorFlow.
+#
+# export_weights reads the weights straight from recipe_generation_rnn.h5
+# with h5py and saves them, together with the tokenizer vocabulary, as
+# recipe_generation_rnn.npz. The embedding is folded into the LSTM input
+# kernel once (embedding @ kernel + bias), so the input projection of a
+# step is a row lookup.
+#
+# Usage: python numpy_lstm.py [model.h5] [model.npz] [tokenizer.pkl]   (needs Keras for the tokenizer)
+import os
+import pickle
+import sys
+
+import h5py
+import numpy as np
+
+from generation import (RECIPE_LENGTH, STOP_SIGN, STREAM_CHUNK_SIZE, combinations, iter_decode, join_chunks,
+                        pad_start_strings)
+from paths import MODEL_PATH as H5_MODEL_PATH, NUMPY_MODEL_PATH, TOKENIZER_PATH
+from text_vectorizer import TextVectorizer
+
+################################# Export
+
+# Weights of every layer of a Keras .h5 file (full model or weights only),
+# by layer name, in the order of the file's layer_names / weight_names.
+def read_h5_weights(path):
+    with h5py.File(path, 'r') as file:
+        group = file['model_weights'] if 'model_weights' in file else file
+        layers = {}
+        for layer_name in group.attrs['layer_names']:
+            layer_name = layer_name.decode('utf-8') if isinstance(layer_name, bytes) else layer_name
+            layer = group[layer_name]
+            weight_names = [name.decode('utf-8') if isinstance(name, bytes) else name
+                            for name in layer.attrs['weight_names']]
+            if weight_names:
+                layers[layer_name] = {name.split('/')[-1].split(':')[0]: np.array(layer[name])
+                                      for name in weight_names}
+        return layers
+
+
+# Writes the npz archive used by NumpyLSTM. index_to_char[i] is the character
+# of token i (tokenizer.index_word, '' for the unassigned index 0).
+def export_weights(h5_path=H5_MODEL_PATH, npz_path=NUMPY_MODEL_PATH, index_to_char=None):
+    layers = read_h5_weights(h5_path)
+    embedding = next(weights for weights in layers.values() if 'embeddings' in weights)
+    lstm = next(weights for weights in layers.values() if 'recurrent_kernel' in weights)
+    dense = next(weights for weights in layers.values()
+                 if set(weights) == {'kernel', 'bias'} and weights['kernel'].ndim == 2)
+
+    if index_to_char is None:
+        index_to_char = load_index_to_char()
+    np.savez(
+        npz_path,
+        embeddings=embedding['embeddings'],
+        lstm_kernel=lstm['kernel'],
+        lstm_recurrent_kernel=lstm['recurrent_kernel'],
+        lstm_bias=lstm['bias'],
+        dense_kernel=dense['kernel'],
+        dense_bias=dense['bias'],
+        index_to_char=np.array(index_to_char, dtype=str),
+    )
+
+
+# Vocabulary of the pickled Keras tokenizer (unpickling it needs Keras).
+def load_index_to_char(tokenizer_path=TOKENIZER_PATH):
+    with open(tokenizer_path, 'rb') as file:
+        tokenizer = pickle.load(file)
+    return [''] + [tokenizer.index_word[index] for index in range(1, len(tokenizer.word_counts) + 1)]
+
+################################# Inference
+
+def sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+
+class NumpyLSTM:
+    # Unlike the stateful Keras model, the (h, c) state is passed explicitly,
+    # so one instance serves any batch size and any number of sessions.
+
+    def __init__(self, path=NUMPY_MODEL_PATH, dtype=np.float32):
+        with np.load(path) as weights:
+            self.units = weights['lstm_recurrent_kernel'].shape[0]
+            # Input projection of every token: embedding @ kernel + bias
+            self.input_table = (weights['embeddings'].astype(np.float64) @ weights['lstm_kernel']
+                                + weights['lstm_bias']).astype(dtype)
+            self.recurrent_kernel = weights['lstm_recurrent_kernel'].astype(dtype)
+            self.dense_kernel = weights['dense_kernel'].astype(dtype)
+            self.dense_bias = weights['dense_bias'].astype(dtype)
+            self.index_to_char = np.array(weights['index_to_char'].tolist(), dtype=object)
+        self.vectorizer = TextVectorizer(self.index_to_char)
+        self.stop_index = self.index_to_char.tolist().index(STOP_SIGN)
+
+    @property
+    def vocab_size(self):
+        return len(self.input_table)
+
+    def initial_state(self, batch_size):
+        zeros = np.zeros((batch_size, self.units), dtype=self.recurrent_kernel.dtype)
+        return zeros, zeros.copy()
+
+    # One step for a batch of token indices: returns the logits (batch, vocab)
+    # and the new state. Gates in Keras order: input, forget, cell, output.
+    def step(self, indices, state):
+        h, c = state
+        units = self.units
+        z = self.input_table[indices] + h @ self.recurrent_kernel
+        i = sigmoid(z[:, :units])
+        f = sigmoid(z[:, units:2 * units])
+        g = np.tanh(z[:, 2 * units:3 * units])
+        o = sigmoid(z[:, 3 * units:])
+        c = f * c + i * g
+        h = o * np.tanh(c)
+        return h @ self.dense_kernel + self.dense_bias, (h, c)
+
+    # Logits of every position of a (batch, length) sequence, from a zero state.
+    def predict(self, sequences):
+        sequences = np.atleast_2d(sequences)
+        state = self.initial_state(len(sequences))
+        outputs = []
+        for position in range(sequences.shape[1]):
+            logits, state = self.step(sequences[:, position], state)
+            outputs.append(logits)
+        return np.stack(outputs, axis=1)
+
+    def texts_to_sequences(self, texts):
+        return self.vectorizer.texts_to_sequences(texts)
+
+
+# Samples one index per row from logits / temperature (Gumbel-max trick).
+def sample_logits(logits, temperatures, rng):
+    gumbel = -np.log(-np.log(rng.random(logits.shape)))
+    return np.argmax(logits / temperatures + gumbel, axis=1)
+
+
+# Same interface as recipe_generator.iter_generate_batch; yields
+# (chunks, finished), see generation.iter_decode.
+def iter_generate_batch(model, start_strings, temperatures, num_generate = RECIPE_LENGTH,
+                        chunk_size=STREAM_CHUNK_SIZE, stop_at_stop_sign=True, seed=None):
+    padded_start_strings = pad_start_strings(start_strings)
+    prompts = model.texts_to_sequences(padded_start_strings)
+    temperatures = np.asarray(temperatures, dtype=np.float64)[:, None]
+    rng = np.random.default_rng(seed)
+    state = model.initial_state(len(prompts))
+
+    def sample(input_indices):
+        nonlocal state
+        logits, state = model.step(input_indices[:, 0], state)
+        return sample_logits(logits, temperatures, rng)
+
+    return iter_decode(sample, padded_start_strings, prompts, model.index_to_char, model.stop_index, num_generate,
+                       chunk_size, stop_at_stop_sign)
+
+
+def generate_batch(model, start_strings, temperatures, num_generate = RECIPE_LENGTH, stop_at_stop_sign=True,
+                   seed=None):
+    return join_chunks(iter_generate_batch(model, start_strings, temperatures, num_generate,
+                                           stop_at_stop_sign=stop_at_stop_sign, seed=seed))
+
+
+def iter_combinations(model, input_letters, recipe_length=RECIPE_LENGTH, seed=None):
+    letters, temperatures = zip(*combinations(input_letters))
+    return iter_generate_batch(model, letters, temperatures, recipe_length, seed=seed)
+
+
+def generate_combinations(model, input_letters, recipe_length=RECIPE_LENGTH, seed=None):
+    letters, temperatures = zip(*combinations(input_letters))
+    texts = generate_batch(model, letters, temperatures, recipe_length, seed=seed)
+    return list(zip(letters, temperatures, texts))
+
+################################# Checking against Keras
+
+# Largest absolute difference between the logits of the Keras model and of
+# the NumPy engine over a text (needs TensorFlow).
+def compare_with_keras(h5_path=H5_MODEL_PATH, npz_path=NUMPY_MODEL_PATH, text='📚Chicken Soup\n'):
+    from recipe_generator import load_model
+
+    model = NumpyLSTM(npz_path)
+    sequence = np.array(model.texts_to_sequences([text]))
+    keras_model = load_model(h5_path, batch_size=1)
+    keras_model.reset_states()
+    keras_logits = keras_model(sequence).numpy()
+    return float(np.abs(keras_logits - model.predict(sequence)).max())
+
+
+if __name__ == '__main__':
+    h5_path = sys.argv[1] if len(sys.argv) > 1 else H5_MODEL_PATH
+    npz_path = sys.argv[2] if len(sys.argv) > 2 else NUMPY_MODEL_PATH
+    tokenizer_path = sys.argv[3] if len(sys.argv) > 3 else TOKENIZER_PATH
+    export_weights(h5_path, npz_path, load_index_to_char(tokenizer_path))
+    print(f'Exported {h5_path} to {npz_path} ({os.path.getsize(npz_path) / 2**20:.1f} MB)')
+    print(f'Max logit difference with Keras: {compare_with_keras(h5_path, npz_path):.2e}')
@@ -0,0 +1,26 @@
+# Locations of the datasets, derived tables and models. Kept free of imports
+# (but os), so the app shell (resources.py) can name the files without
+# loading pandas or TensorFlow.
+import os
+
+PRODUCTS_PATH = 'data/footprint_products_agribalyse.csv'
+RECIPES_PATH = 'data/recipes_full.csv'
+
+# Output of build_footprints.py
+FOOTPRINTS_DIR = 'data/footprints'
+INGREDIENT_FOOTPRINTS_PATH = os.path.join(FOOTPRINTS_DIR, 'ingredients.parquet')
+RECIPE_FOOTPRINTS_PATH = os.path.join(FOOTPRINTS_DIR, 'recipes.parquet')
+# The df_extracted products the tables were computed with (see incremental_update.py)
+PRODUCTS_SNAPSHOT_PATH = os.path.join(FOOTPRINTS_DIR, 'products.parquet')
+# Hash of the recipes CSV the tables were computed with: they are keyed by row
+# position in it, so they do not apply to any other version of the file.
+FOOTPRINTS_SOURCE_PATH = os.path.join(FOOTPRINTS_DIR, 'source.json')
+# Corpus ingredient lines matched to every product, the weights of the
+# product autocomplete (see autocomplete.py)
+PRODUCT_WEIGHTS_PATH = os.path.join(FOOTPRINTS_DIR, 'product_weights.json')
+
+# The trained Keras model, its weights exported for numpy_lstm.py and the
+# pickled character tokenizer of the training notebook
+MODEL_PATH = 'recipe_generation_rnn.h5'
+NUMPY_MODEL_PATH = 'recipe_generation_rnn.npz'
+TOKENIZER_PATH = 'tokenizer.pkl'
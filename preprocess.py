@@ -0,0 +1,265 @@
+# Parallel preprocessing of the raw recipes, run once and reused by the
+# training (training_data.py) and footprint (footprint_calculation.py) jobs.
+#
+# The raw recipes are read in chunks and the chunks are spread over a
+# process pool; every worker runs the stages of recipes.iter_recipes
+# (recipe_validate_required_fields -> recipe_to_string ->
+# filter_recipes_by_length) and vectorizes the recipe strings. The output
+# directory, named after a hash of the config (raw files, max length,
+# vocabulary), holds:
+#   tokens.npy / token_offsets.npy   all the token ids, recipe i is
+#                                    tokens[offsets[i]:offsets[i + 1]]
+#                                    (not written without a vocabulary)
+#   text.bin / text_offsets.npy      the recipe strings (UTF-8)
+#   stats.json                       recipes surviving each stage
+# and is opened with mmap by PreprocessedCorpus. A changed raw file or
+# setting gives a new hash, so stale output is never reused. Jobs that only
+# need the recipe strings (footprint_calculation.py) pass no vocabulary: the
+# texts are built without the tokenizer or the model.
+#
+# Usage: python preprocess.py [--workers N] [--max-length N] [--vocabulary tokenizer.pkl|model.npz]
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import pickle
+import shutil
+import sys
+from collections import Counter
+from multiprocessing import Pool
+
+import numpy as np
+
+from paths import NUMPY_MODEL_PATH, TOKENIZER_PATH
+from recipes import (DATASET_FILE_NAMES, MAX_RECIPE_LENGTH, RAW_DATASET_DIR, filter_recipes_by_length,
+                     iter_raw_recipes, print_stats, recipe_to_string, recipe_validate_required_fields)
+
+PREPROCESSED_DIR = 'data/preprocessed'
+# The vocabulary is read from the exported NumPy weights when they exist
+# (no Keras needed), from the tokenizer otherwise.
+VOCABULARY_PATHS = [NUMPY_MODEL_PATH, TOKENIZER_PATH]
+
+# Raw recipes sent to a worker at a time.
+SHARD_SIZE = 2_000
+
+# Bumped when the output format or the stages change.
+FORMAT_VERSION = 1
+
+################################# Config
+
+# Character of every token id ('' for the unassigned id 0), from the pickled
+# Keras tokenizer (needs Keras) or from the weights of numpy_lstm.py.
+def load_vocabulary(path=None):
+    if path is None:
+        path = next((path for path in VOCABULARY_PATHS if os.path.exists(path)), VOCABULARY_PATHS[-1])
+    if path.endswith('.npz'):
+        with np.load(path) as weights:
+            return weights['index_to_char'].tolist()
+    with open(path, 'rb') as file:
+        tokenizer = pickle.load(file)
+    return [''] + [tokenizer.index_word[index] for index in range(1, len(tokenizer.word_counts) + 1)]
+
+
+# index_to_char is None for a corpus of texts only.
+def preprocess_config(index_to_char, dataset_dir=RAW_DATASET_DIR, file_names=DATASET_FILE_NAMES,
+                      max_length=MAX_RECIPE_LENGTH):
+    files = []
+    for file_name in file_names:
+        stat = os.stat(os.path.join(dataset_dir, file_name))
+        files.append([file_name, stat.st_size, stat.st_mtime_ns])
+    return {
+        'version': FORMAT_VERSION,
+        'files': files,
+        'max_length': max_length,
+        'index_to_char': None if index_to_char is None else list(index_to_char),
+    }
+
+
+def config_hash(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+# Smallest unsigned type holding every token id.
+def token_dtype(vocabulary_size):
+    return np.dtype(np.uint8 if vocabulary_size <= 256 else np.uint16)
+
+################################# Workers
+
+_vectorizer = None
+_max_length = None
+
+
+def _init_worker(index_to_char, max_length):
+    global _vectorizer, _max_length
+    from text_vectorizer import TextVectorizer
+    _vectorizer = None if index_to_char is None else TextVectorizer(index_to_char)
+    _max_length = max_length
+
+
+# Stages of recipes.iter_recipes plus vectorization for one shard: returns
+# the recipe strings, their concatenated token ids with the offsets of every
+# recipe (None without a vocabulary), and the stage counts. Characters out of the vocabulary are
+# dropped, like Tokenizer.texts_to_sequences does.
+def process_shard(raw_recipes):
+    stats = Counter()
+    texts = []
+    for recipe in raw_recipes:
+        if not recipe_validate_required_fields(recipe):
+            continue
+        stats['validated'] += 1
+        recipe_string = recipe_to_string(recipe)
+        stats['stringified'] += 1
+        if not filter_recipes_by_length(recipe_string, _max_length):
+            continue
+        stats['filtered'] += 1
+        texts.append(recipe_string)
+    if _vectorizer is None:
+        return texts, None, None, stats
+    tokens, offsets = _vectorizer.encode_batch(texts)
+    return texts, tokens, offsets, stats
+
+
+def _shards(recipes, shard_size):
+    recipes = iter(recipes)
+    while shard := list(itertools.islice(recipes, shard_size)):
+        yield shard
+
+################################# Build
+
+# Writes a .npy file from a raw file of dtype values without loading it.
+def _raw_to_npy(raw_path, npy_path, dtype):
+    count = os.path.getsize(raw_path) // dtype.itemsize
+    with open(raw_path, 'rb') as raw, open(npy_path, 'wb') as out:
+        np.lib.format.write_array_header_1_0(out, {'descr': np.lib.format.dtype_to_descr(dtype),
+                                                   'fortran_order': False, 'shape': (count,)})
+        shutil.copyfileobj(raw, out)
+    os.remove(raw_path)
+
+
+def preprocess(index_to_char, dataset_dir=RAW_DATASET_DIR, file_names=DATASET_FILE_NAMES,
+               max_length=MAX_RECIPE_LENGTH, output_dir=PREPROCESSED_DIR, workers=None, shard_size=SHARD_SIZE):
+    config = preprocess_config(index_to_char, dataset_dir, file_names, max_length)
+    corpus_dir = os.path.join(output_dir, config_hash(config))
+    build_dir = corpus_dir + '.tmp'
+    os.makedirs(build_dir, exist_ok=True)
+    with_tokens = index_to_char is not None
+    if with_tokens:
+        index_to_char = list(index_to_char)
+    dtype = token_dtype(len(index_to_char)) if with_tokens else None
+
+    stats = Counter()
+    token_offsets, text_offsets = [np.zeros(1, dtype=np.int64)], [np.zeros(1, dtype=np.int64)]
+    n_tokens, n_bytes = 0, 0
+    with open(os.path.join(build_dir, 'tokens.raw'), 'wb') as tokens_file, \
+            open(os.path.join(build_dir, 'text.bin'), 'wb') as text_file, \
+            Pool(workers, initializer=_init_worker, initargs=(index_to_char, max_length)) as pool:
+        raw_recipes = iter_raw_recipes(dataset_dir, file_names, stats)
+        # imap keeps the order of the shards, so the output does not depend on
+        # the number of workers.
+        for texts, tokens, offsets, shard_stats in pool.imap(process_shard, _shards(raw_recipes, shard_size)):
+            stats.update(shard_stats)
+            if not texts:
+                continue
+            if with_tokens:
+                tokens_file.write(tokens.astype(dtype).tobytes())
+                token_offsets.append(n_tokens + offsets[1:])
+                n_tokens += len(tokens)
+
+            encoded = [text.encode('utf-8') for text in texts]
+            text_file.write(b''.join(encoded))
+            byte_lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+            text_offsets.append(n_bytes + np.cumsum(byte_lengths))
+            n_bytes += int(byte_lengths.sum())
+
+    if with_tokens:
+        _raw_to_npy(os.path.join(build_dir, 'tokens.raw'), os.path.join(build_dir, 'tokens.npy'), dtype)
+        np.save(os.path.join(build_dir, 'token_offsets.npy'), np.concatenate(token_offsets))
+    else:
+        os.remove(os.path.join(build_dir, 'tokens.raw'))
+    np.save(os.path.join(build_dir, 'text_offsets.npy'), np.concatenate(text_offsets))
+    with open(os.path.join(build_dir, 'stats.json'), 'w') as file:
+        json.dump(dict(stats), file, indent=2)
+    with open(os.path.join(build_dir, 'config.json'), 'w') as file:
+        json.dump(config, file)
+
+    # Swapped in only once complete, so readers never see a partial corpus.
+    if os.path.exists(corpus_dir):
+        shutil.rmtree(corpus_dir)
+    os.replace(build_dir, corpus_dir)
+    return corpus_dir
+
+################################# Reading
+
+class PreprocessedCorpus:
+    # Iterating over the corpus yields the token ids of every recipe, so it
+    # can be passed as the sequences of the training_data.py pipelines.
+    # tokens and offsets are None for a corpus of texts only.
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        self.tokens, self.offsets = None, None
+        if os.path.exists(os.path.join(corpus_dir, 'tokens.npy')):
+            self.tokens = np.load(os.path.join(corpus_dir, 'tokens.npy'), mmap_mode='r')
+            self.offsets = np.load(os.path.join(corpus_dir, 'token_offsets.npy'), mmap_mode='r')
+        self._text_offsets = np.load(os.path.join(corpus_dir, 'text_offsets.npy'), mmap_mode='r')
+        self._text_file = open(os.path.join(corpus_dir, 'text.bin'), 'rb')
+        # mmap cannot map empty files
+        size = os.fstat(self._text_file.fileno()).st_size
+        self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        with open(os.path.join(corpus_dir, 'stats.json')) as file:
+            self.stats = Counter(json.load(file))
+
+    def __len__(self):
+        return len(self._text_offsets) - 1
+
+    def sequence(self, index):
+        if self.tokens is None:
+            raise ValueError(f'{self.corpus_dir} was preprocessed without a vocabulary (texts only)')
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.sequence(index)
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def text(self, index):
+        return str(memoryview(self._text)[self._text_offsets[index]:self._text_offsets[index + 1]], 'utf-8')
+
+    def texts(self):
+        for index in range(len(self)):
+            yield self.text(index)
+
+    def close(self):
+        if isinstance(self._text, mmap.mmap):
+            self._text.close()
+        self._text_file.close()
+
+
+# Opens the preprocessed corpus of the current raw files and settings,
+# running the preprocessing first if it has not been run for them. Without
+# index_to_char (see load_vocabulary) the corpus holds the texts only.
+def open_corpus(index_to_char=None, dataset_dir=RAW_DATASET_DIR, file_names=DATASET_FILE_NAMES,
+                max_length=MAX_RECIPE_LENGTH, output_dir=PREPROCESSED_DIR, workers=None):
+    config = preprocess_config(index_to_char, dataset_dir, file_names, max_length)
+    corpus_dir = os.path.join(output_dir, config_hash(config))
+    if not os.path.exists(corpus_dir):
+        preprocess(index_to_char, dataset_dir, file_names, max_length, output_dir, workers)
+    return PreprocessedCorpus(corpus_dir)
+
+
+def _option(args, name, default):
+    return type(default)(args[args.index(name) + 1]) if name in args else default
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    workers = _option(args, '--workers', 0) or None
+    index_to_char = load_vocabulary(_option(args, '--vocabulary', '') or None)
+    corpus_dir = preprocess(index_to_char, max_length=_option(args, '--max-length', MAX_RECIPE_LENGTH),
+                            workers=workers)
+    corpus = PreprocessedCorpus(corpus_dir)
+    print_stats(corpus.stats)
+    print(f'{len(corpus)} recipes, {len(corpus.tokens)} tokens in {corpus_dir}')
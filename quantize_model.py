@@ -0,0 +1,146 @@
+# Post-training quantization of the recipe generation model for CPU serving.
+#
+# The stateful Keras model (recipe_generator.build_model) cannot be
+# converted as is, so its weights are copied into a single-step model with
+# the LSTM state as explicit inputs and outputs:
+#   (tokens (batch, 1), h, c) -> (logits, h, c)
+# which the TFLite converter turns into a .tflite file, either in float32 or
+# with dynamic-range quantization (int8 weights, float activations: no
+# calibration data is needed). The conversion works offline.
+#
+# TFLiteLSTM runs the converted file with the same step interface as
+# numpy_lstm.NumpyLSTM, and recipe_generator.load_model loads it when given a
+# .tflite path. The interpreter of the small tflite_runtime package is used
+# when it is installed, and the vocabulary is written next to the .tflite file
+# at conversion time (<model>.vocab.json), so serving does not need TensorFlow.
+#
+# Usage: python quantize_model.py [model.h5] [model.tflite] [--float]
+import json
+import os
+import sys
+
+import numpy as np
+
+from generation import STOP_SIGN
+from paths import MODEL_PATH as H5_MODEL_PATH
+from text_vectorizer import TextVectorizer
+
+TFLITE_MODEL_PATH = 'recipe_generation_rnn_int8.tflite'
+TFLITE_FLOAT_MODEL_PATH = 'recipe_generation_rnn_float32.tflite'
+
+# Name of the signature of the converted step function.
+SIGNATURE_KEY = 'serving_default'
+
+
+# Character of every token id of a converted model, saved next to it.
+def vocabulary_path(tflite_path):
+    return os.path.splitext(tflite_path)[0] + '.vocab.json'
+
+################################# Conversion
+
+# Single-step model with the weights of the trained model (needs TensorFlow).
+def build_step_model(h5_path=H5_MODEL_PATH):
+    import tensorflow as tf
+    from recipe_generator import EMBEDDING_DIM, RNN_UNITS, VOCABULARY_SIZE, load_model
+
+    trained = load_model(h5_path, batch_size=1)
+    tokens = tf.keras.Input(shape=(1,), dtype=tf.int32, name='tokens')
+    h = tf.keras.Input(shape=(RNN_UNITS,), name='h')
+    c = tf.keras.Input(shape=(RNN_UNITS,), name='c')
+    x = tf.keras.layers.Embedding(VOCABULARY_SIZE, EMBEDDING_DIM)(tokens)
+    x, h_out, c_out = tf.keras.layers.LSTM(RNN_UNITS, return_state=True)(x, initial_state=[h, c])
+    logits = tf.keras.layers.Dense(VOCABULARY_SIZE)(x)
+    model = tf.keras.Model([tokens, h, c], [logits, h_out, c_out])
+    # Same layers in the same order, so the weights line up.
+    model.set_weights(trained.get_weights())
+    return model
+
+
+# Converts the model to a .tflite file (plus its vocabulary file); quantize
+# applies dynamic-range quantization. Returns the size of the model in bytes.
+def convert(h5_path=H5_MODEL_PATH, tflite_path=TFLITE_MODEL_PATH, quantize=True):
+    import tensorflow as tf
+    from recipe_generator import INDEX_TO_CHAR
+
+    model = build_step_model(h5_path)
+    units = model.inputs[1].shape[-1]
+
+    # Named outputs, so the interpreter's signature runner returns them by name.
+    @tf.function(input_signature=[tf.TensorSpec([None, 1], tf.int32, name='tokens'),
+                                  tf.TensorSpec([None, units], tf.float32, name='h'),
+                                  tf.TensorSpec([None, units], tf.float32, name='c')])
+    def step(tokens, h, c):
+        logits, h, c = model([tokens, h, c])
+        return {'logits': logits, 'h': h, 'c': c}
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([step.get_concrete_function()], model)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    with open(tflite_path, 'wb') as file:
+        file.write(converter.convert())
+    with open(vocabulary_path(tflite_path), 'w', encoding='utf-8') as file:
+        json.dump(INDEX_TO_CHAR.tolist(), file, ensure_ascii=False)
+    return os.path.getsize(tflite_path)
+
+################################# Inference
+
+def _interpreter(path):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path)
+
+
+class TFLiteLSTM:
+    # Same interface as numpy_lstm.NumpyLSTM: the (h, c) state is passed
+    # explicitly and one instance serves any batch size (the signature
+    # runner resizes the inputs when the batch size changes).
+
+    def __init__(self, path=TFLITE_MODEL_PATH, index_to_char=None):
+        self.interpreter = _interpreter(path)
+        self.runner = self.interpreter.get_signature_runner(SIGNATURE_KEY)
+        self.units = int(self.runner.get_input_details()['h']['shape_signature'][-1])
+        if index_to_char is None:
+            with open(vocabulary_path(path), encoding='utf-8') as file:
+                index_to_char = json.load(file)
+        self.index_to_char = np.array(index_to_char, dtype=object)
+        self.vectorizer = TextVectorizer(self.index_to_char)
+        self.stop_index = self.index_to_char.tolist().index(STOP_SIGN)
+
+    @property
+    def vocab_size(self):
+        return len(self.index_to_char)
+
+    def initial_state(self, batch_size):
+        zeros = np.zeros((batch_size, self.units), dtype=np.float32)
+        return zeros, zeros.copy()
+
+    def step(self, indices, state):
+        h, c = state
+        outputs = self.runner(tokens=np.asarray(indices, dtype=np.int32)[:, None], h=h, c=c)
+        return outputs['logits'], (outputs['h'], outputs['c'])
+
+    # Logits of every position of a (batch, length) sequence, from a zero state.
+    def predict(self, sequences):
+        sequences = np.atleast_2d(sequences)
+        state = self.initial_state(len(sequences))
+        outputs = []
+        for position in range(sequences.shape[1]):
+            logits, state = self.step(sequences[:, position], state)
+            outputs.append(logits)
+        return np.stack(outputs, axis=1)
+
+    def texts_to_sequences(self, texts):
+        return self.vectorizer.texts_to_sequences(texts)
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--float']
+    quantize = '--float' not in sys.argv
+    h5_path = args[0] if args else H5_MODEL_PATH
+    tflite_path = args[1] if len(args) > 1 else (TFLITE_MODEL_PATH if quantize else TFLITE_FLOAT_MODEL_PATH)
+    size = convert(h5_path, tflite_path, quantize)
+    print(f'Converted {h5_path} to {tflite_path} ({size / 2**20:.1f} MB, '
+          f'{"dynamic-range quantized" if quantize else "float32"})')
@@ -7,72 +7,138 @@ import pickle
 
 import streamlit as st
 
-with open('/Users/CristaVillatoro/Desktop/tahini-tensor-student-code 2/FINAL-project-Cookwise/recipes_generator/tokenizer.pkl', 'rb') as file:
+import instrumentation
+from generation import (RECIPE_LENGTH, STOP_SIGN, STREAM_CHUNK_SIZE, combinations, iter_decode, join_chunks,
+                        pad_start_strings)
+from paths import MODEL_PATH, TOKENIZER_PATH
+from text_vectorizer import TextVectorizer
+
+with open(TOKENIZER_PATH, 'rb') as file:
     tokenizer = pickle.load(file)
 
-model = keras.models.load_model('recipe_generation_rnn.h5')
-model.compile()
+# Architecture of the trained model (see recipes_generator.ipynb)
+# Adding +1 to take into account a special unassigned 0 index.
+VOCABULARY_SIZE = len(tokenizer.word_counts) + 1
+EMBEDDING_DIM = 256
+RNN_UNITS = 1024
+
+
+def build_model(vocab_size, embedding_dim, rnn_units, batch_size):
+    model = tf.keras.models.Sequential()
+
+    model.add(tf.keras.layers.Embedding(
+        input_dim=vocab_size,
+        output_dim=embedding_dim,
+        batch_input_shape=[batch_size, None]
+    ))
+
+    model.add(tf.keras.layers.LSTM(
+        units=rnn_units,
+        return_sequences=True,
+        stateful=True,
+        recurrent_initializer=tf.keras.initializers.GlorotNormal()
+    ))
+
+    model.add(tf.keras.layers.Dense(vocab_size))
+
+    return model
+
+
+# The model is loaded on demand (the app caches it, see resources.recipe_model).
+# The LSTM is stateful, so the batch size (number of texts generated at once)
+# is fixed when the model is built; the trained weights fit any batch size.
+# A .tflite path loads the converted model of quantize_model.py instead,
+# which serves any batch size.
+@instrumentation.timed('load model')
+def load_model(path=MODEL_PATH, batch_size=1):
+    if path.endswith('.tflite'):
+        from quantize_model import TFLiteLSTM
+        return TFLiteLSTM(path, INDEX_TO_CHAR)
+    model = build_model(VOCABULARY_SIZE, EMBEDDING_DIM, RNN_UNITS, batch_size)
+    model.load_weights(path)
+    return model
 
 
 # Stop word
 STOP_WORD_TITLE = emoji.emojize(':books:')
 
+STOP_INDEX = tokenizer.word_index[STOP_SIGN]
+
+# Character of every token index, so a whole batch of sampled indices is
+# decoded with one lookup (index 0 is unassigned).
+INDEX_TO_CHAR = np.array([''] + [tokenizer.index_word[index] for index in range(1, VOCABULARY_SIZE)], dtype=object)
+
+# Vectorizes the start strings like tokenizer.texts_to_sequences, in NumPy.
+VECTORIZER = TextVectorizer(INDEX_TO_CHAR)
+
+# One decoding step compiled with tf.function: feeds the (batch, 1) input
+# indices through the stateful model and samples the next index of every
+# row with its temperature. Traced once per model: the compiled function is
+# kept on the model itself (it references the model, so a cache keyed on the
+# model would keep every model alive).
+def generation_step(model):
+    if getattr(model, '_generation_step', None) is None:
+        @tf.function(input_signature=[tf.TensorSpec([None, 1], tf.int64), tf.TensorSpec([None, 1], tf.float32)])
+        def step(input_indices, temperatures):
+            predictions = model(input_indices)[:, -1, :]
+            return tf.random.categorical(predictions / temperatures, num_samples=1)[:, 0]
+        model._generation_step = step
+    return model._generation_step
+
+
+# Generates one text per start string in a single batch (the model must be
+# built with batch_size=len(start_strings)); every row has its own
+# temperature. Yields (chunks, finished), see generation.iter_decode.
+def iter_generate_batch(model, start_strings, temperatures, num_generate = 1000, chunk_size=STREAM_CHUNK_SIZE,
+                        stop_at_stop_sign=True):
+    if not isinstance(model, tf.keras.Model):
+        # TFLite model: same step interface as the NumPy engine
+        import numpy_lstm
+        return numpy_lstm.iter_generate_batch(model, start_strings, temperatures, num_generate, chunk_size,
+                                              stop_at_stop_sign)
+    padded_start_strings = pad_start_strings(start_strings)
+    # Converting our start strings to numbers (vectorizing).
+    prompts = VECTORIZER.texts_to_sequences(padded_start_strings)
+    temperatures = tf.constant(np.asarray(temperatures, dtype=np.float32)[:, None])
+    step = generation_step(model)
+
+    # Every decoding step is timed as an 'inference' stage of the current run.
+    def sample(input_indices):
+        with instrumentation.stage('inference'):
+            return step(tf.constant(input_indices), temperatures).numpy()
+
+    model.reset_states()
+    return iter_decode(sample, padded_start_strings, prompts, INDEX_TO_CHAR, STOP_INDEX, num_generate,
+                       chunk_size, stop_at_stop_sign)
+
+
+def generate_batch(model, start_strings, temperatures, num_generate = 1000, stop_at_stop_sign=True):
+    return join_chunks(iter_generate_batch(model, start_strings, temperatures, num_generate,
+                                           stop_at_stop_sign=stop_at_stop_sign))
+
+
+# Yields the generated text as it is produced: first the padded start
+# string, then chunks of up to chunk_size characters. The model must be
+# built with batch_size=1.
+def iter_generate_text(model, start_string, num_generate = 1000, temperature=1.0, chunk_size=STREAM_CHUNK_SIZE):
+    for chunks, _ in iter_generate_batch(model, [start_string], [temperature], num_generate, chunk_size):
+        yield chunks[0]
+
 
 def generate_text(model, start_string, num_generate = 1000, temperature=1.0):
-    # Evaluation step (generating text using the learned model)
-    
-    padded_start_string = STOP_WORD_TITLE + start_string
+    return generate_batch(model, [start_string], [temperature], num_generate)[0]
 
-    # Converting our start string to numbers (vectorizing).
-    input_indices = np.array(tokenizer.texts_to_sequences([padded_start_string]))
 
-    # Empty string to store our results.
-    text_generated = []
+# Streams all the candidates, generated as one batch (the model must be
+# built with batch_size=len(combinations(input_letters))). Yields the list of
+# new chunks of every candidate and the finished ones, see iter_generate_batch.
+def iter_combinations(model, input_letters, recipe_length=RECIPE_LENGTH):
+    letters, temperatures = zip(*combinations(input_letters))
+    return iter_generate_batch(model, letters, temperatures, recipe_length)
 
-    # Here batch size == 1.
-    model.reset_states()
-    for char_index in range(num_generate):
-        predictions = model(input_indices)
-        # remove the batch dimension
-        predictions = tf.squeeze(predictions, 0)
-
-        # Using a categorical distribution to predict the character returned by the model.
-        predictions = predictions / temperature
-        predicted_id = tf.random.categorical(
-            predictions,
-            num_samples=1
-        )[-1,0].numpy()
-
-        # We pass the predicted character as the next input to the model
-        # along with the previous hidden state.
-        input_indices = tf.expand_dims([predicted_id], 0)
-        
-        next_character = tokenizer.sequences_to_texts(input_indices.numpy())[0]
-
-        text_generated.append(next_character)
-
-    return (padded_start_string + ''.join(text_generated))
-
-def generate_combinations(model, input_letters):
-    recipe_length = 1000
-    try_letters = ['', '\n', 'A', 'B', 'C', input_letters[0],input_letters[1]]
-    try_temperature = [1.0, 0.8]
-
-    for letter in try_letters:
-        for temperature in try_temperature:
-            generated_text = generate_text(
-                model,
-                start_string=letter,
-                num_generate = recipe_length,
-                temperature=temperature
-            )
-            # print(f'Attempt: "{letter}" + {temperature}')
-            # print('-----------------------------------')
-            # print(generated_text)
-            # print('\n\n')
-    
-    return generated_text
-
-# if __name__ == 'main':
-#     generate_combinations(model)
-#generate_combinations(model)
\ No newline at end of file
+
+# Returns every candidate as a (start string, temperature, text) tuple.
+def generate_combinations(model, input_letters, recipe_length=RECIPE_LENGTH):
+    letters, temperatures = zip(*combinations(input_letters))
+    texts = generate_batch(model, letters, temperatures, recipe_length)
+    return list(zip(letters, temperatures, texts))
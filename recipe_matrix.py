@@ -0,0 +1,81 @@
+# Sparse recipes x products matrix of the whole corpus: entry (r, p) is the
+# kg of product p (row of df_extracted) in recipe r, summed over the
+# ingredient lines matched to it. Built from the ingredient table of
+# build_footprints.py and saved next to it with scipy's save_npz.
+#
+# With it the footprint of every recipe for any indicator, or any weighted
+# mix of indicators, is one sparse matrix-vector product:
+#   recipe_matrix @ (impacts.matrix @ weights)
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+from impact_matrix import INDICATOR_NAMES
+from paths import FOOTPRINTS_DIR
+
+RECIPE_MATRIX_PATH = os.path.join(FOOTPRINTS_DIR, 'recipe_products.npz')
+
+
+# df_ingredients: one row per ingredient line (recipe_id, lci_index, quantity_kg),
+# see footprint.ingredient_footprints. Lines without a quantity or a match are left out.
+def build_recipe_matrix(df_ingredients, n_recipes, n_products):
+    df = df_ingredients.reset_index()
+    df = df[df['quantity_kg'].notna() & (df['quantity_kg'] > 0) & (df['lci_index'] >= 0)]
+    matrix = sp.csr_matrix(
+        (df['quantity_kg'].to_numpy(np.float64), (df['recipe_id'].to_numpy(), df['lci_index'].to_numpy())),
+        shape=(n_recipes, n_products))
+    # Lines of the same recipe matched to the same product are added up.
+    matrix.sum_duplicates()
+    return matrix
+
+
+def save_recipe_matrix(matrix, path=RECIPE_MATRIX_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sp.save_npz(path, matrix)
+
+
+# None if build_footprints.py has not been run yet.
+def load_recipe_matrix(path=RECIPE_MATRIX_PATH):
+    if not os.path.exists(path):
+        return None
+    return sp.load_npz(path).tocsr()
+
+
+# Weights over the indicators ({'co2': 1, 'land_use': 0.5}) as a vector.
+# normalize divides every indicator by its mean over the products, so
+# indicators with different units weigh in on the same scale.
+def indicator_weights(weights, impacts, normalize=False):
+    vector = np.array([weights.get(indicator, 0) for indicator in INDICATOR_NAMES], dtype=np.float64)
+    if normalize:
+        means = impacts.matrix.mean(axis=0)
+        vector = np.divide(vector, means, out=np.zeros_like(vector), where=means > 0)
+    return vector
+
+
+# Footprint of every recipe for the weighted mix of indicators.
+def recipe_scores(matrix, impacts, weights):
+    return matrix @ (impacts.matrix @ weights)
+
+
+# Recipes (of recipe_ids, all by default, in their order) with at least one
+# quantified ingredient: the others score 0 for every indicator and would
+# always rank first.
+def scored_recipes(matrix, recipe_ids=None):
+    quantified = np.diff(matrix.indptr) > 0
+    if recipe_ids is None:
+        return np.flatnonzero(quantified)
+    recipe_ids = np.asarray(recipe_ids)
+    return recipe_ids[quantified[recipe_ids]]
+
+
+# The k recipe ids (of recipe_ids, all recipes by default) with the
+# lowest (or highest) scores, in order.
+def rank_recipes(scores, recipe_ids=None, k=20, ascending=True):
+    recipe_ids = np.arange(len(scores)) if recipe_ids is None else np.asarray(recipe_ids)
+    values = scores[recipe_ids] if ascending else -scores[recipe_ids]
+    if len(recipe_ids) > k:
+        top = np.argpartition(values, k - 1)[:k]
+    else:
+        top = np.arange(len(recipe_ids))
+    return recipe_ids[top[np.argsort(values[top], kind='stable')]]
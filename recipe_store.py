@@ -0,0 +1,124 @@
+# Compact on-disk recipe store built once from data/recipes_full.csv.
+#
+# Every column is stored as one UTF-8 blob (<column>.bin) plus an int64
+# offsets array (<column>.offsets.npy, len = recipes + 1). Both are opened
+# with mmap, so opening the store is instant, any recipe is read by id
+# without parsing the CSV, and the pages are shared by every process that
+# opens the same files.
+#
+# Usage: python recipe_store.py [recipes.csv] [store_dir]
+import mmap
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from footprint import RECIPES_PATH
+
+STORE_DIR = 'data/recipes_store'
+COLUMNS = ['Title', 'Ingredients', 'Procedure']
+
+# Rows of the CSV read at a time while building the store.
+BUILD_CHUNK_SIZE = 10_000
+
+
+def build_recipe_store(csv_path=RECIPES_PATH, store_dir=STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    blobs = {column: open(os.path.join(store_dir, f'{column}.bin.tmp'), 'wb') for column in COLUMNS}
+    offsets = {column: [np.zeros(1, dtype=np.int64)] for column in COLUMNS}
+    sizes = dict.fromkeys(COLUMNS, 0)
+
+    try:
+        for chunk in pd.read_csv(csv_path, usecols=COLUMNS, chunksize=BUILD_CHUNK_SIZE):
+            for column in COLUMNS:
+                encoded = [value.encode('utf-8') for value in chunk[column].fillna('').astype(str)]
+                blobs[column].write(b''.join(encoded))
+                lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+                offsets[column].append(sizes[column] + np.cumsum(lengths))
+                sizes[column] += int(lengths.sum())
+    finally:
+        for blob in blobs.values():
+            blob.close()
+
+    # Files are swapped in only once complete, so readers never see a partial store.
+    for column in COLUMNS:
+        np.save(os.path.join(store_dir, f'{column}.offsets.tmp.npy'), np.concatenate(offsets[column]))
+        os.replace(os.path.join(store_dir, f'{column}.bin.tmp'), os.path.join(store_dir, f'{column}.bin'))
+        os.replace(os.path.join(store_dir, f'{column}.offsets.tmp.npy'),
+                   os.path.join(store_dir, f'{column}.offsets.npy'))
+
+
+class RecipeStore:
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = store_dir
+        self._files = {}
+        self._blobs = {}
+        self._offsets = {}
+        for column in COLUMNS:
+            self._offsets[column] = np.load(os.path.join(store_dir, f'{column}.offsets.npy'), mmap_mode='r')
+            file = open(os.path.join(store_dir, f'{column}.bin'), 'rb')
+            self._files[column] = file
+            # mmap cannot map empty files
+            size = os.fstat(file.fileno()).st_size
+            self._blobs[column] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+    def __len__(self):
+        return len(self._offsets[COLUMNS[0]]) - 1
+
+    def get(self, column, recipe_id):
+        offsets = self._offsets[column]
+        start, end = offsets[recipe_id], offsets[recipe_id + 1]
+        return str(memoryview(self._blobs[column])[start:end], 'utf-8')
+
+    def title(self, recipe_id):
+        return self.get('Title', recipe_id)
+
+    def ingredients(self, recipe_id):
+        return self.get('Ingredients', recipe_id)
+
+    def procedure(self, recipe_id):
+        return self.get('Procedure', recipe_id)
+
+    def recipe(self, recipe_id):
+        return {column: self.get(column, recipe_id) for column in COLUMNS}
+
+    def column(self, column):
+        return [self.get(column, recipe_id) for recipe_id in range(len(self))]
+
+    # Ids of the recipes whose column contains any of the terms (case-sensitive,
+    # like str.contains). The regex runs directly on the mapped bytes.
+    def search(self, column, terms):
+        terms = [term for term in terms if term]
+        if not terms:
+            return np.arange(len(self))
+        pattern = re.compile(b'|'.join(re.escape(term.encode('utf-8')) for term in terms))
+
+        spans = np.array([match.span() for match in pattern.finditer(self._blobs[column])],
+                         dtype=np.int64).reshape(-1, 2)
+        offsets = self._offsets[column]
+        first = np.searchsorted(offsets, spans[:, 0], side='right') - 1
+        last = np.searchsorted(offsets, spans[:, 1] - 1, side='right') - 1
+        # A match running over the end of one recipe into the next does not count.
+        return np.unique(first[first == last])
+
+    def close(self):
+        for blob in self._blobs.values():
+            if isinstance(blob, mmap.mmap):
+                blob.close()
+        for file in self._files.values():
+            file.close()
+
+
+# Opens the store, building it first if it is missing or older than the CSV.
+def open_recipe_store(csv_path=RECIPES_PATH, store_dir=STORE_DIR):
+    marker = os.path.join(store_dir, f'{COLUMNS[-1]}.offsets.npy')
+    if not os.path.exists(marker) or os.path.getmtime(marker) < os.path.getmtime(csv_path):
+        build_recipe_store(csv_path, store_dir)
+    return RecipeStore(store_dir)
+
+
+if __name__ == '__main__':
+    build_recipe_store(*sys.argv[1:3])
@@ -0,0 +1,204 @@
+import csv
+import json
+import os
+from collections import Counter
+
+import emoji
+
+################################## Raw data
+
+RAW_DATASET_DIR = 'recipes_raw'
+DATASET_FILE_NAMES = [
+    'recipes_raw_nosource_ar.json',
+    'recipes_raw_nosource_epi.json',
+    'recipes_raw_nosource_fn.json',
+]
+
+# Characters read from a raw file at a time.
+CHUNK_SIZE = 1 << 20
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',:]}'
+
+
+# Yields the values of a top-level JSON object ({"id": {recipe}, ...}) one at
+# a time, reading the file in chunks instead of loading it with json.load.
+def iter_json_object_values(path, chunk_size=CHUNK_SIZE):
+    with open(path, encoding='utf-8') as file:
+        buffer, pos, eof = '', 0, False
+
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+        # Next non-whitespace character (not consumed).
+        def peek():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if eof:
+                    raise ValueError(f'Unexpected end of file in {path}')
+                fill()
+
+        # Decodes the next JSON value, reading more of the file until it is complete.
+        def decode():
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buffer, pos)
+                    # A value must be followed by a delimiter; otherwise it may be a
+                    # number ("1e" of "1e10") that continues in the next chunk.
+                    if eof or (end < len(buffer) and buffer[end] in _DELIMITERS):
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+
+        if peek() != '{':
+            raise ValueError(f'{path} does not contain a JSON object')
+        pos += 1
+        if peek() == '}':
+            return
+        while True:
+            key = decode()
+            if peek() != ':':
+                raise ValueError(f'Expected ":" after key {key!r} in {path}')
+            pos += 1
+            yield decode()
+
+            separator = peek()
+            pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f'Expected "," or "}}" after key {key!r} in {path}')
+
+
+def iter_raw_recipes(dataset_dir=RAW_DATASET_DIR, file_names=DATASET_FILE_NAMES, stats=None):
+    for dataset_file_name in file_names:
+        for recipe in iter_json_object_values(os.path.join(dataset_dir, dataset_file_name)):
+            if stats is not None:
+                stats['raw'] += 1
+                stats[f'raw:{dataset_file_name}'] += 1
+            yield recipe
+
+################################ Processing the data
+
+# Filters out recipes which don't have either title or ingredients or instructions.
+def recipe_validate_required_fields(recipe):
+    required_keys = ['title', 'ingredients', 'instructions']
+
+    if not recipe:
+        return False
+
+    for required_key in required_keys:
+        if not recipe[required_key]:
+            return False
+
+        if type(recipe[required_key]) == list and len(recipe[required_key]) == 0:
+            return False
+
+    return True
+
+# Adding Landmarks
+STOP_WORD_TITLE = emoji.emojize(':books:')
+STOP_WORD_INGREDIENTS = emoji.emojize('\n:hot_pepper:\n\n')
+STOP_WORD_INSTRUCTIONS = emoji.emojize('\n:cook:\n\n')
+
+# Converts recipe object to string (sequence of characters) for later usage in RNN input.
+def recipe_to_string(recipe):
+    # This string is presented as a part of recipes so we need to clean it up.
+    noize_string = 'ADVERTISEMENT'
+
+    title = recipe['title']
+    ingredients = recipe['ingredients']
+    instructions = recipe['instructions'].split('\n')
+
+    ingredients_string = ''
+    for ingredient in ingredients:
+        ingredient = ingredient.replace(noize_string, '')
+        if ingredient:
+            ingredients_string += f'• {ingredient}\n'
+
+    instructions_string = ''
+    for instruction in instructions:
+        instruction = instruction.replace(noize_string, '')
+        if instruction:
+            instructions_string += f'▪︎ {instruction}\n'
+
+    return f'{STOP_WORD_TITLE}{title}\n{STOP_WORD_INGREDIENTS}{ingredients_string}{STOP_WORD_INSTRUCTIONS}{instructions_string}'
+
+# A limit of 2000 characters for the recipes will cover 80+% cases.
+# Decided to train RNN with this maximum recipe length limit.
+MAX_RECIPE_LENGTH = 2000
+
+def filter_recipes_by_length(recipe_test, max_length=MAX_RECIPE_LENGTH):
+    return len(recipe_test) <= max_length
+
+# Streaming pipeline: raw -> validated -> stringified -> length-filtered.
+# Only one recipe is held in memory at a time; stats counts every stage.
+def iter_recipes(dataset_dir=RAW_DATASET_DIR, file_names=DATASET_FILE_NAMES,
+                 max_length=MAX_RECIPE_LENGTH, stats=None):
+    stats = Counter() if stats is None else stats
+    for recipe in iter_raw_recipes(dataset_dir, file_names, stats):
+        if not recipe_validate_required_fields(recipe):
+            continue
+        stats['validated'] += 1
+
+        recipe_string = recipe_to_string(recipe)
+        stats['stringified'] += 1
+
+        if not filter_recipes_by_length(recipe_string, max_length):
+            continue
+        stats['filtered'] += 1
+        yield recipe_string
+
+
+def print_stats(stats):
+    for stage in ['raw', 'validated', 'stringified', 'filtered']:
+        print(f'{stage:>12}: {stats[stage]}')
+
+################################# Recipes table
+
+RECIPES_CSV_COLUMNS = ['Title', 'Ingredients', 'Procedure']
+
+# split the recipe into title, ingredients, and procedure
+def split_recipe(recipe_string):
+    recipe = recipe_string.split("\n\n")
+    return recipe[0], recipe[2], recipe[4]
+
+
+# Inverse of split_recipe: the recipe string (as the RNN was trained on) of a
+# row of the recipes table.
+def join_recipe(title, ingredients, procedure):
+    return "\n\n".join([title, STOP_WORD_INGREDIENTS.strip("\n"), ingredients,
+                          STOP_WORD_INSTRUCTIONS.strip("\n"), procedure])
+
+
+# Writes the (Title, Ingredients, Procedure) table used by the app row by row.
+# The table is written aside and swapped in once complete, so an error while
+# writing never leaves the app with a truncated file.
+def write_recipes_csv(recipe_strings, path):
+    count = 0
+    tmp_path = path + '.tmp'
+    try:
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(RECIPES_CSV_COLUMNS)
+            for recipe_string in recipe_strings:
+                writer.writerow(split_recipe(recipe_string))
+                count += 1
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
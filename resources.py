@@ -0,0 +1,250 @@
+# Central resource layer of the Streamlit app.
+#
+# Every dataset, derived table and model used by a page is loaded through
+# this module. Resources are built on first use, once per process, and shared
+# by all sessions (st.cache_resource). Each loader is keyed on the mtime and
+# size of the files it reads, so an updated file is picked up on the next
+# rerun without restarting the app.
+import os
+import time
+
+import streamlit as st
+
+import instrumentation
+# paths.py has no dependencies: pandas and the models are only imported by
+# the loaders that need them.
+from paths import (FOOTPRINTS_SOURCE_PATH, INGREDIENT_FOOTPRINTS_PATH, MODEL_PATH, NUMPY_MODEL_PATH, PRODUCTS_PATH,
+                   PRODUCT_WEIGHTS_PATH, RECIPE_FOOTPRINTS_PATH, RECIPES_PATH)
+
+# Seconds spent building each resource the last time it was (re)loaded
+# (also recorded as a 'load <resource>' stage of the rerun, see instrumentation.py).
+LOAD_TIMINGS = {}
+
+
+# Cheap file fingerprint used to invalidate the cached resources.
+def fingerprint(*paths):
+    stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stats.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stats.append((path, None, None))
+    return tuple(stats)
+
+
+def _timed(name, load, *args):
+    start = time.perf_counter()
+    resource = load(*args)
+    LOAD_TIMINGS[name] = time.perf_counter() - start
+    instrumentation.record(f'load {name}', LOAD_TIMINGS[name])
+    return resource
+
+
+def load_timings():
+    return dict(LOAD_TIMINGS)
+
+################################# Products
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _products(path, file_fingerprint):
+    from footprint import load_products
+    return _timed('products', load_products, path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _extracted_products(path, file_fingerprint):
+    from footprint import extract_products
+    return _timed('extracted products', extract_products, _products(path, file_fingerprint))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _product_options(path, file_fingerprint):
+    return _timed('product options', lambda df: df['LCI Name'].tolist(), _products(path, file_fingerprint))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _product_impacts(path, file_fingerprint):
+    from impact_matrix import ImpactMatrix
+    return _timed('product impacts', ImpactMatrix, _products(path, file_fingerprint))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _extracted_impacts(path, file_fingerprint):
+    from impact_matrix import ImpactMatrix
+    return _timed('extracted impacts', ImpactMatrix, _extracted_products(path, file_fingerprint))
+
+
+def products(path=PRODUCTS_PATH):
+    return _products(path, fingerprint(path))
+
+
+# Products of the food subgroups that can be recipe ingredients (df_extracted)
+def extracted_products(path=PRODUCTS_PATH):
+    return _extracted_products(path, fingerprint(path))
+
+
+def product_options(path=PRODUCTS_PATH):
+    return _product_options(path, fingerprint(path))
+
+
+# Impact matrices (see impact_matrix.py) of all the products and of df_extracted
+def product_impacts(path=PRODUCTS_PATH):
+    return _product_impacts(path, fingerprint(path))
+
+
+def extracted_impacts(path=PRODUCTS_PATH):
+    return _extracted_impacts(path, fingerprint(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _product_autocomplete(path, weights_path, file_fingerprint):
+    from autocomplete import product_autocomplete
+    return _timed('product autocomplete', product_autocomplete, product_options(path), weights_path)
+
+
+# Suggestions for the product inputs, most used in the recipe corpus first
+# (weights saved by build_footprints.py, the footprint tables are not loaded)
+def product_autocomplete(path=PRODUCTS_PATH, weights_path=PRODUCT_WEIGHTS_PATH):
+    return _product_autocomplete(path, weights_path, fingerprint(path, weights_path))
+
+################################# Matching
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _batch_matcher(path, file_fingerprint):
+    from batch_matcher import BatchMatcher
+    return _timed('batch matcher', lambda df: BatchMatcher(df['LCI Name']), _extracted_products(path, file_fingerprint))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _match_cache(path, file_fingerprint):
+    from match_cache import MatchCache
+    return _timed('match cache', MatchCache, path)
+
+
+def batch_matcher(path=PRODUCTS_PATH):
+    return _batch_matcher(path, fingerprint(path))
+
+
+# The ingredient -> LCI match cache survives restarts (it is stored on disk).
+def match_cache(path=PRODUCTS_PATH):
+    return _match_cache(path, fingerprint(path))
+
+################################# Recipes
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _recipe_store(path, file_fingerprint):
+    from recipe_store import open_recipe_store
+    return _timed('recipe store', open_recipe_store, path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _footprint_tables(ingredients_path, recipes_path, csv_path, file_fingerprint):
+    from footprint import load_footprints
+    return _timed('footprint tables', load_footprints, ingredients_path, recipes_path, csv_path)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _ingredient_index(path, file_fingerprint):
+    from ingredient_index import open_ingredient_index
+    return _timed('ingredient index', open_ingredient_index, _recipe_store(path, file_fingerprint), path)
+
+
+# The full recipes (memory-mapped, see recipe_store.py)
+def recipe_store(path=RECIPES_PATH):
+    return _recipe_store(path, fingerprint(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _ingredient_autocomplete(path, file_fingerprint):
+    from autocomplete import ingredient_autocomplete
+    return _timed('ingredient autocomplete', ingredient_autocomplete, _ingredient_index(path, file_fingerprint))
+
+
+# Ingredient term -> recipe ids index used by the cookbook search
+def ingredient_index(path=RECIPES_PATH):
+    return _ingredient_index(path, fingerprint(path))
+
+
+# Suggestions for the cookbook ingredients, most used in the recipes first
+def ingredient_autocomplete(path=RECIPES_PATH):
+    return _ingredient_autocomplete(path, fingerprint(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _recipe_matrix(path, csv_path, file_fingerprint):
+    from footprint import footprints_match_recipes
+    from recipe_matrix import load_recipe_matrix
+    if not footprints_match_recipes(csv_path):
+        return None
+    return _timed('recipe matrix', load_recipe_matrix, path)
+
+
+# The footprint tables are keyed by row position in the recipes CSV, so their
+# cache keys include it and its fingerprint saved with them.
+def _footprints_fingerprint(csv_path, *paths):
+    return fingerprint(*paths, csv_path, FOOTPRINTS_SOURCE_PATH)
+
+
+# Recipes x products kg matrix written by build_footprints.py, None if not
+# built (or built from another recipes CSV)
+def recipe_matrix(path=None, csv_path=RECIPES_PATH):
+    from recipe_matrix import RECIPE_MATRIX_PATH
+    path = path or RECIPE_MATRIX_PATH
+    return _recipe_matrix(path, csv_path, _footprints_fingerprint(csv_path, path))
+
+
+# Per-recipe footprints precomputed by build_footprints.py, (None, None) if
+# not built (or built from another recipes CSV)
+def footprint_tables(ingredients_path=INGREDIENT_FOOTPRINTS_PATH, recipes_path=RECIPE_FOOTPRINTS_PATH,
+                     csv_path=RECIPES_PATH):
+    return _footprint_tables(ingredients_path, recipes_path, csv_path,
+                             _footprints_fingerprint(csv_path, ingredients_path, recipes_path))
+
+################################# Recipe generation model
+
+# One model per batch size (the LSTM is stateful), see recipe_generator.load_model
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _recipe_model(path, batch_size, file_fingerprint):
+    from recipe_generator import load_model
+    return _timed(f'recipe model (batch of {batch_size})', load_model, path, batch_size)
+
+
+def recipe_model(batch_size=1, path=MODEL_PATH):
+    return _recipe_model(path, batch_size, fingerprint(path))
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _numpy_recipe_model(path, file_fingerprint):
+    from numpy_lstm import NumpyLSTM
+    return _timed('recipe model (NumPy)', NumpyLSTM, path)
+
+
+# The NumPy engine of numpy_lstm.py (no TensorFlow needed), None if the
+# weights have not been exported yet.
+def numpy_recipe_model(path=NUMPY_MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    return _numpy_recipe_model(path, fingerprint(path))
+
+
+# The pool whose thread is running: stopped when new weights replace it.
+_running_pool = None
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _generation_pool(path, file_fingerprint):
+    global _running_pool
+    from generation_cache import GenerationPool, numpy_generator
+    if _running_pool is not None:
+        _running_pool.stop()
+    _running_pool = GenerationPool(numpy_generator(_numpy_recipe_model(path, file_fingerprint))).start()
+    return _running_pool
+
+
+# Pre-generated recipes of every keyword set (generation_cache.py), refilled
+# in the background with the NumPy engine; None without its weights.
+def generation_pool(path=NUMPY_MODEL_PATH):
+    if not os.path.exists(path):
+        return None
+    return _generation_pool(path, fingerprint(path))
@@ -0,0 +1,98 @@
+# An incremental update of the footprint tables must give the same tables as
+# a full rebuild with the new products dataset.
+#
+# Run with: python -m pytest tests
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from build_footprints import build_footprints  # noqa: E402
+from footprint import (FOOD_SUBGROUPS, INGREDIENT_FOOTPRINTS_PATH, PRODUCTS_PATH, RECIPE_FOOTPRINTS_PATH,  # noqa: E402
+                       RECIPES_PATH, extract_products, load_products)
+from impact_matrix import INDICATOR_COLUMNS  # noqa: E402
+from incremental_update import update_footprints  # noqa: E402
+from recipe_matrix import load_recipe_matrix  # noqa: E402
+
+N_PRODUCTS = 300
+N_RECIPES = 60
+QUANTITIES = ['1 cup', '2 tablespoons', '1/2 teaspoon', '3', '200 g', '']
+
+
+# A few hundred products, with the first product of every food subgroup
+# (extract_products needs them all).
+def products_sample(df_all):
+    df_extracted = df_all[df_all['Food Subgroup'].isin(FOOD_SUBGROUPS)].drop_duplicates('LCI Name')
+    anchors = df_extracted.drop_duplicates('Food Subgroup').index
+    names = set(df_extracted.loc[anchors, 'LCI Name']) | set(df_extracted['LCI Name'].sample(N_PRODUCTS, random_state=0))
+    return df_all[df_all['LCI Name'].isin(names)], anchors
+
+
+# Recipes whose ingredient lines are made of product name words, so most of
+# them match some product.
+def write_recipes(path, names, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for recipe in range(N_RECIPES):
+        lines = []
+        for name in rng.choice(names, size=rng.integers(3, 9)):
+            words = name.replace(',', '').lower().split()[:rng.integers(1, 4)]
+            lines.append(f'• {rng.choice(QUANTITIES)} {" ".join(words)}'.replace('  ', ' '))
+        rows.append({'Title': f'Recipe {recipe}', 'Ingredients': '\n'.join(lines), 'Procedure': 'Mix.'})
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+
+# The products dataset of the next revision: some products removed, some
+# added back from the full dataset and some with new impacts.
+def next_revision(df_products, df_all, anchors):
+    rng = np.random.default_rng(1)
+    df_next = df_products.drop(rng.choice(df_products.index.difference(anchors), size=20, replace=False))
+    df_extracted = extract_products(df_all)
+    added = df_extracted.loc[~df_extracted['LCI Name'].isin(df_products['LCI Name']), 'LCI Name']
+    df_next = pd.concat([df_next, df_all[df_all['LCI Name'].isin(added.drop_duplicates().iloc[:20])]])
+    changed = rng.choice(df_next.index, size=20, replace=False)
+    df_next.loc[changed, INDICATOR_COLUMNS] *= 1.5
+    return df_next
+
+
+def footprint_tables():
+    return (pd.read_parquet(INGREDIENT_FOOTPRINTS_PATH), pd.read_parquet(RECIPE_FOOTPRINTS_PATH),
+            load_recipe_matrix())
+
+
+@pytest.mark.parametrize('revision', ['changed impacts', 'added and removed products'])
+def test_update_matches_full_rebuild(tmp_path, monkeypatch, revision):
+    df_all = load_products(os.path.join(ROOT, PRODUCTS_PATH))
+    df_products, anchors = products_sample(df_all)
+    if revision == 'changed impacts':
+        df_next = df_products.copy()
+        df_next.loc[df_next.index[::7], INDICATOR_COLUMNS] *= 2
+    else:
+        df_next = next_revision(df_products, df_all, anchors)
+
+    # The paths of the tables are relative to the working directory.
+    tables = {}
+    for name in ['incremental', 'full']:
+        directory = tmp_path / name
+        os.makedirs(directory / os.path.dirname(PRODUCTS_PATH))
+        monkeypatch.chdir(directory)
+        write_recipes(RECIPES_PATH, df_products['LCI Name'].tolist())
+        if name == 'incremental':
+            df_products.to_csv(PRODUCTS_PATH)
+            build_footprints()
+            df_next.to_csv(PRODUCTS_PATH)
+            assert update_footprints() is not None
+        else:
+            df_next.to_csv(PRODUCTS_PATH)
+            build_footprints()
+        tables[name] = footprint_tables()
+
+    (ingredients, totals, matrix), (full_ingredients, full_totals, full_matrix) = tables['incremental'], tables['full']
+    pd.testing.assert_frame_equal(ingredients, full_ingredients)
+    pd.testing.assert_frame_equal(totals, full_totals)
+    assert (matrix != full_matrix).nnz == 0
@@ -0,0 +1,132 @@
+# NumPy replacement of the character-level Keras Tokenizer of tokenizer.pkl
+# (char_level=True, filters='', lower=False, no OOV token).
+#
+# Every token is one code point, so the vocabulary becomes two arrays: the
+# id of every code point (-1 when unknown; the table covers all of Unicode,
+# 2 MB, so no bounds check is needed) and the code point of every id.
+# A batch of strings is encoded by joining it, viewing the UTF-32 encoding as
+# a uint32 array and looking all the code points up at once; decoding goes
+# the other way. Unknown characters (encoding) and unknown ids or the
+# unassigned id 0 (decoding) are dropped, as the Keras tokenizer does.
+# Decoding does not put a space between the characters like Keras
+# sequences_to_texts (which the notebook then strips), so
+# decode(encode(text)) == text for any text of the vocabulary.
+#
+# Usage: python text_vectorizer.py [tokenizer.pkl] [max recipes]   (checks against Keras)
+import sys
+import time
+
+import numpy as np
+
+
+class TextVectorizer:
+
+    def __init__(self, index_to_char):
+        self.index_to_char = list(index_to_char)
+        code_points = [ord(char) if char else 0 for char in self.index_to_char]
+        if any(len(char) > 1 for char in self.index_to_char):
+            raise ValueError('TextVectorizer needs a character-level vocabulary')
+        self.id_to_code_point = np.array(code_points, dtype=np.uint32)
+        self.code_point_to_id = np.full(sys.maxunicode + 1, -1,
+                                        dtype=np.int16 if len(code_points) <= 2**15 else np.int32)
+        for index, char in enumerate(self.index_to_char):
+            if char:
+                self.code_point_to_id[ord(char)] = index
+
+    # From a vocabulary file, see preprocess.load_vocabulary.
+    @classmethod
+    def load(cls, path=None):
+        from preprocess import load_vocabulary
+        return cls(load_vocabulary(path))
+
+    @property
+    def vocab_size(self):
+        return len(self.index_to_char)
+
+    # Token ids of all the texts, concatenated, and the offsets of every text
+    # (text i is tokens[offsets[i]:offsets[i + 1]]).
+    def encode_batch(self, texts):
+        texts = list(texts)
+        code_points = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+        ids = self.code_point_to_id[code_points].astype(np.int32)
+        bounds = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in texts], out=bounds[1:])
+        known = ids >= 0
+        if known.all():
+            return ids, bounds
+        # Offsets of the texts once the unknown characters are dropped
+        kept = np.concatenate([[0], np.cumsum(known, dtype=np.int64)])
+        return ids[known], kept[bounds]
+
+    def encode(self, text):
+        return self.encode_batch([text])[0]
+
+    # Same output as Tokenizer.texts_to_sequences.
+    def texts_to_sequences(self, texts):
+        tokens, offsets = self.encode_batch(texts)
+        return [tokens[start:end].tolist() for start, end in zip(offsets[:-1], offsets[1:])]
+
+    # Texts of concatenated token ids (see encode_batch).
+    def decode_batch(self, tokens, offsets):
+        tokens = np.asarray(tokens)
+        offsets = np.asarray(offsets)
+        known = (tokens > 0) & (tokens < len(self.id_to_code_point))
+        if not known.all():
+            tokens = tokens[known]
+            offsets = np.concatenate([[0], np.cumsum(known, dtype=np.int64)])[offsets]
+        text = self.id_to_code_point[tokens].tobytes().decode('utf-32-le')
+        return [text[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def decode(self, sequence):
+        return self.decode_batch(sequence, [0, len(sequence)])[0]
+
+    # Tokenizer.sequences_to_texts without the spaces between the characters.
+    def sequences_to_texts(self, sequences):
+        sequences = [np.asarray(sequence, dtype=np.int64).ravel() for sequence in sequences]
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum([len(sequence) for sequence in sequences], out=offsets[1:])
+        tokens = np.concatenate(sequences) if sequences else np.zeros(0, dtype=np.int64)
+        return self.decode_batch(tokens, offsets)
+
+
+# Compares the vectorizer with the Keras tokenizer on texts: same token ids,
+# same decoded texts (but for the spaces Keras adds) and texts decoded back
+# to themselves. Returns the (seconds of Keras, seconds of the vectorizer) of
+# encoding + decoding, and raises AssertionError on the first difference.
+def check_round_trip(tokenizer, texts, vectorizer=None):
+    vectorizer = vectorizer or TextVectorizer(
+        [''] + [tokenizer.index_word[index] for index in range(1, len(tokenizer.word_counts) + 1)])
+
+    start = time.perf_counter()
+    keras_sequences = tokenizer.texts_to_sequences(texts)
+    keras_texts = tokenizer.sequences_to_texts(keras_sequences)
+    keras_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokens, offsets = vectorizer.encode_batch(texts)
+    numpy_texts = vectorizer.decode_batch(tokens, offsets)
+    numpy_seconds = time.perf_counter() - start
+
+    for index, (keras_sequence, start, end) in enumerate(zip(keras_sequences, offsets[:-1], offsets[1:])):
+        assert keras_sequence == tokens[start:end].tolist(), f'Encoding differs for text {index}'
+    for index, (text, keras_text, numpy_text) in enumerate(zip(texts, keras_texts, numpy_texts)):
+        assert keras_text == ' '.join(numpy_text), f'Decoding differs for text {index}'
+        known = ''.join(char for char in text if char in tokenizer.word_index)
+        assert numpy_text == known, f'Text {index} does not round-trip'
+    return keras_seconds, numpy_seconds
+
+
+if __name__ == '__main__':
+    import pickle
+
+    from paths import TOKENIZER_PATH
+    from preprocess import open_corpus
+
+    tokenizer_path = sys.argv[1] if len(sys.argv) > 1 else TOKENIZER_PATH
+    max_recipes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    with open(tokenizer_path, 'rb') as file:
+        tokenizer = pickle.load(file)
+    texts = list(open_corpus().texts())[:max_recipes]
+    keras_seconds, numpy_seconds = check_round_trip(tokenizer, texts)
+    print(f'{len(texts)} recipes round-trip identically: Keras {keras_seconds:.2f} s, '
+          f'NumPy {numpy_seconds:.3f} s ({keras_seconds / numpy_seconds:.0f}x faster)')
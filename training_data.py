@@ -0,0 +1,178 @@
+# tf.data input pipelines for training the recipe generation model.
+#
+# The notebook pads every recipe to MAX_RECIPE_LENGTH + 1 characters with
+# the stop sign, so most of the LSTM steps of a batch run on padding. Two
+# pipelines avoid it:
+#   - bucketed_dataset: recipes of similar length are batched together
+#     (bucket_by_sequence_length) and padded to the longest of their batch
+#     only; every recipe keeps at least one stop sign, as in the notebook.
+#   - packed_dataset: the recipes, each followed by a stop sign, are
+#     concatenated into batch_size streams cut into windows of
+#     sequence_length characters. Row r of a batch continues row r of the
+#     previous batch, which suits the stateful LSTM of the notebook; there
+#     is no padding at all.
+# padded_dataset is the notebook's pipeline, kept for comparison.
+#
+# pipeline_stats reports the tokens of an epoch, the padding ratio (share of
+# the input positions holding the stop sign: the padding, or the one
+# separator per recipe when packed) and how fast the pipeline yields tokens;
+# TokenThroughput logs the training tokens/sec.
+#
+# Usage: python training_data.py [tokenizer.pkl|model.npz] [max recipes]
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from generation import STOP_SIGN
+from recipes import MAX_RECIPE_LENGTH
+
+BATCH_SIZE = 64
+SHUFFLE_BUFFER_SIZE = 1000
+
+# Upper bounds (exclusive) of the recipe lengths, stop sign included, of the buckets.
+BUCKET_BOUNDARIES = [250, 500, 750, 1000, 1250, 1500, 1750]
+
+# Characters per row of a packed batch.
+PACKED_SEQUENCE_LENGTH = 500
+
+
+# Applied to every recipe before batching, as in the notebook (on a batch,
+# the slices would cut the batch axis).
+def split_input_target(recipe):
+    input_text = recipe[:-1]
+    target_text = recipe[1:]
+
+    return input_text, target_text
+
+
+# Every vectorized recipe followed by one stop sign.
+def _with_stop(sequences, stop_index):
+    for sequence in sequences:
+        yield np.append(np.asarray(sequence, dtype=np.int32), np.int32(stop_index))
+
+
+def _recipe_dataset(sequences, stop_index):
+    return tf.data.Dataset.from_generator(lambda: _with_stop(sequences, stop_index),
+                                          output_signature=tf.TensorSpec([None], tf.int32))
+
+
+# The notebook's pipeline: every recipe padded (or cut) to max_length + 1.
+def padded_dataset(sequences, stop_index, batch_size=BATCH_SIZE, max_length=MAX_RECIPE_LENGTH,
+                   shuffle_buffer=SHUFFLE_BUFFER_SIZE):
+    def pad(recipe):
+        recipe = recipe[:max_length + 1]
+        return tf.pad(recipe, [[0, max_length + 1 - tf.shape(recipe)[0]]], constant_values=stop_index)
+
+    return (_recipe_dataset(sequences, stop_index)
+            .map(pad, num_parallel_calls=tf.data.AUTOTUNE)
+            .map(split_input_target, num_parallel_calls=tf.data.AUTOTUNE)
+            .cache()
+            .shuffle(shuffle_buffer)
+            .batch(batch_size, drop_remainder=True)
+            .prefetch(tf.data.AUTOTUNE))
+
+
+# Batches of recipes of similar lengths, padded with the stop sign to the
+# longest recipe of the batch. cache_path caches the vectorized recipes on
+# disk ('' keeps them in memory), so the later epochs skip the generator.
+def bucketed_dataset(sequences, stop_index, batch_size=BATCH_SIZE, boundaries=BUCKET_BOUNDARIES,
+                     shuffle_buffer=SHUFFLE_BUFFER_SIZE, cache_path=''):
+    return (_recipe_dataset(sequences, stop_index)
+            .map(split_input_target, num_parallel_calls=tf.data.AUTOTUNE)
+            .cache(cache_path)
+            .shuffle(shuffle_buffer)
+            .bucket_by_sequence_length(
+                # Length of the recipe, stop sign included
+                element_length_func=lambda input_text, target_text: tf.shape(input_text)[0] + 1,
+                bucket_boundaries=boundaries,
+                bucket_batch_sizes=[batch_size] * (len(boundaries) + 1),
+                padding_values=(np.int32(stop_index), np.int32(stop_index)),
+                drop_remainder=True)
+            .prefetch(tf.data.AUTOTUNE))
+
+
+# Windows of batch_size continuous streams of recipes. The recipes are
+# shuffled (seed) before they are concatenated; the order changes on every
+# pass over the dataset unless a seed is given.
+def packed_dataset(sequences, stop_index, batch_size=BATCH_SIZE, sequence_length=PACKED_SEQUENCE_LENGTH,
+                   seed=None):
+    def windows():
+        recipes = list(_with_stop(sequences, stop_index))
+        order = np.random.default_rng(seed).permutation(len(recipes))
+        stream = np.concatenate([recipes[index] for index in order])
+        row_length = len(stream) // batch_size
+        rows = stream[:batch_size * row_length].reshape(batch_size, row_length)
+        for start in range(0, row_length - sequence_length, sequence_length):
+            yield rows[:, start:start + sequence_length], rows[:, start + 1:start + sequence_length + 1]
+
+    spec = tf.TensorSpec([batch_size, sequence_length], tf.int32)
+    return tf.data.Dataset.from_generator(windows, output_signature=(spec, spec)).prefetch(tf.data.AUTOTUNE)
+
+
+# One pass over the (input, target) batches of a pipeline: batches, input
+# tokens, padding ratio (input positions holding the stop sign) and tokens
+# per second yielded by the pipeline.
+def pipeline_stats(dataset, stop_index, max_batches=None):
+    batches, tokens, padding = 0, 0, 0
+    start = time.perf_counter()
+    for inputs, _ in dataset.take(-1 if max_batches is None else max_batches):
+        inputs = inputs.numpy()
+        batches += 1
+        tokens += inputs.size
+        padding += int((inputs == stop_index).sum())
+    seconds = time.perf_counter() - start
+    return {
+        'batches': batches,
+        'tokens': tokens,
+        'padding_tokens': padding,
+        'padding_ratio': padding / tokens if tokens else 0.0,
+        'tokens_per_second': tokens / seconds if seconds else 0.0,
+    }
+
+
+class TokenThroughput(tf.keras.callbacks.Callback):
+    # Logs the training tokens/sec of every epoch (tokens_per_epoch from
+    # pipeline_stats) and the tokens/sec net of padding.
+
+    def __init__(self, tokens_per_epoch, padding_ratio=0.0):
+        super().__init__()
+        self.tokens_per_epoch = tokens_per_epoch
+        self.padding_ratio = padding_ratio
+        self._start = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = time.perf_counter() - self._start
+        tokens_per_second = self.tokens_per_epoch / seconds
+        if logs is not None:
+            logs['tokens_per_second'] = tokens_per_second
+            logs['recipe_tokens_per_second'] = tokens_per_second * (1 - self.padding_ratio)
+        print(f' - {tokens_per_second:.0f} tokens/s ({tokens_per_second * (1 - self.padding_ratio):.0f} '
+              f'without padding)')
+
+
+def print_stats(name, stats):
+    print(f"{name:>10}: {stats['batches']:>6} batches, {stats['tokens']:>11} tokens, "
+          f"{stats['padding_ratio']:>6.1%} padding, {stats['tokens_per_second']:>10.0f} tokens/s")
+
+
+if __name__ == '__main__':
+    import itertools
+
+    from preprocess import load_vocabulary, open_corpus
+
+    # The vectorized recipes of preprocess.py
+    index_to_char = load_vocabulary(sys.argv[1] if len(sys.argv) > 1 else None)
+    max_recipes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    stop_index = index_to_char.index(STOP_SIGN)
+    corpus = open_corpus(index_to_char)
+    sequences = corpus if max_recipes is None else list(itertools.islice(corpus, max_recipes))
+
+    for name, dataset in [('padded', padded_dataset(sequences, stop_index)),
+                          ('bucketed', bucketed_dataset(sequences, stop_index)),
+                          ('packed', packed_dataset(sequences, stop_index, seed=0))]:
+        print_stats(name, pipeline_stats(dataset, stop_index))